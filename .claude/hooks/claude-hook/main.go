@@ -188,6 +188,13 @@ func main() {
 	sessionCtx := getSessionContext(sessionID, projectDir)
 	envCtx := getEnvironmentContext()
 
+	// For PostToolUse, read the tool duration before the state file is
+	// rewritten by incrementToolCount (which drops fields it doesn't know)
+	var toolDuration *float64
+	if toolName, ok := payload["tool_name"].(string); ok && toolName != "" && *eventType == "PostToolUse" {
+		toolDuration = readToolDuration(sessionID, toolName)
+	}
+
 	// Update tool count for PostToolUse
 	if *eventType == "PostToolUse" {
 		incrementToolCount(sessionID)
@@ -220,14 +227,12 @@ func main() {
 			Metadata: make(map[string]interface{}),
 		}
 
-		// For PostToolUse, try to read duration from temp file
-		if *eventType == "PostToolUse" {
-			if duration := readToolDuration(sessionID, toolName); duration != nil {
-				toolMeta.DurationMs = duration
+		// For PostToolUse, attach the duration recorded by post_tool_use.py
+		if toolDuration != nil {
+			toolMeta.DurationMs = toolDuration
 
-				// Update session stats
-				updateSessionStats(sessionID, toolName, *duration, payload)
-			}
+			// Update session stats
+			updateSessionStats(sessionID, toolName, *toolDuration, payload)
 		}
 	}
 
@@ -468,30 +473,54 @@ func readChatTranscript(transcriptPath string) []map[string]interface{} {
 	return chat
 }
 
+// lastToolDuration is the entry post_tool_use.py records
+type lastToolDuration struct {
+	ToolName   string  `json:"toolName"`
+	DurationMs float64 `json:"durationMs"`
+}
+
+// stateLogRecord is a record of the Python hooks' append-only state log
+type stateLogRecord struct {
+	Op         string  `json:"op"`
+	Session    string  `json:"session"`
+	Tool       string  `json:"tool"`
+	DurationMs float64 `json:"durationMs"`
+}
+
 func readToolDuration(sessionID, toolName string) *float64 {
-	logDir := filepath.Join("logs", sessionID)
-	durationFile := filepath.Join(logDir, "last_tool_duration.json")
+	// post_tool_use.py records the last tool duration in the session state:
+	// the snapshot, updated by any records in the state log
+	var last *lastToolDuration
 
-	data, err := os.ReadFile(durationFile)
-	if err != nil {
-		return nil
+	if data, err := os.ReadFile(getStateFile()); err == nil {
+		var allState map[string]struct {
+			LastToolDuration *lastToolDuration `json:"lastToolDuration"`
+		}
+		if json.Unmarshal(data, &allState) == nil {
+			last = allState["session_"+sessionID].LastToolDuration
+		}
 	}
 
-	var durData struct {
-		ToolName   string  `json:"tool_name"`
-		DurationMs float64 `json:"duration_ms"`
-	}
-	if err := json.Unmarshal(data, &durData); err != nil {
-		return nil
+	if data, err := os.ReadFile(getStateLogFile()); err == nil {
+		for _, line := range bytes.Split(data, []byte("\n")) {
+			var record stateLogRecord
+			if json.Unmarshal(line, &record) != nil || record.Session != sessionID {
+				continue
+			}
+			switch record.Op {
+			case "tool_end":
+				last = &lastToolDuration{ToolName: record.Tool, DurationMs: record.DurationMs}
+			case "take_duration":
+				last = nil
+			}
+		}
 	}
 
-	if durData.ToolName == toolName {
-		// Delete after reading
-		os.Remove(durationFile)
-		return &durData.DurationMs
+	if last == nil || last.ToolName != toolName {
+		return nil
 	}
 
-	return nil
+	return &last.DurationMs
 }
 
 func sendEventToServer(event Event, serverURL string) bool {
@@ -597,6 +626,11 @@ func getStateFile() string {
 	return filepath.Join(home, ".claude-observability-state.json")
 }
 
+func getStateLogFile() string {
+	home, _ := os.UserHomeDir()
+	return filepath.Join(home, ".claude-observability-state.log")
+}
+
 func loadSessionState(sessionID string) SessionState {
 	stateFile := getStateFile()
 
@@ -0,0 +1,5 @@
+module hook-client
+
+go 1.21
+
+// No external dependencies required - uses only Go stdlib
@@ -0,0 +1,328 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#     "anthropic",
+#     "python-dotenv",
+#     "orjson",
+# ]
+# ///
+
+"""
+Hook Daemon
+Long-lived server that runs Claude Code hook scripts without a cold
+interpreter start per tool call.
+
+The daemon imports the hooks' dependencies once and listens on a UNIX
+socket. The hook-client stub connects, passes its stdin/stdout/stderr file
+descriptors (SCM_RIGHTS) along with argv, cwd and environment, and the
+daemon forks a child that runs the hook script against those descriptors.
+The child's exit status is written back to the client, which exits with it,
+so Claude Code sees exactly the same protocol as a direct `uv run` hook.
+
+Forking per request keeps hooks isolated from each other and from the
+daemon: a hook that calls sys.exit/os._exit, changes directory or leaks
+state only affects its own child.
+
+Usage:
+    uv run --script .claude/hooks/daemon/hook_daemon.py [--socket PATH]
+"""
+
+import os
+import sys
+import signal
+import select
+import socket
+import argparse
+import builtins
+import traceback
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parent.parent
+
+# Default socket location; hook-client derives the same path from the hook
+# script it is asked to run (<hooks dir>/daemon/hook_daemon.sock)
+DEFAULT_SOCKET = HOOKS_DIR / 'daemon' / 'hook_daemon.sock'
+
+# Modules imported once in the daemon so forked hooks find them warm.
+# utils.constants is deliberately absent: it reads CLAUDE_HOOKS_LOG_DIR at
+# import time, which must come from the client's environment.
+PRELOAD_MODULES = (
+    'argparse', 'datetime', 'http.client', 'shlex', 'subprocess', 'urllib.parse',
+    'json_codec', 'metadata_collector', 'tool_metadata_parser', 'workflow_intelligence',
+    'utils.session_log', 'utils.model_extractor', 'utils.summarizer',
+    'dotenv', 'anthropic',
+)
+
+# Largest request header (JSON: hook, args, cwd, env) accepted from a client
+MAX_HEADER_BYTES = 1 << 20
+
+# Seconds a client has to send its request after connecting
+REQUEST_TIMEOUT = 5
+
+# Compiled hook scripts: path -> (mtime_ns, code object)
+_CODE_CACHE = {}
+
+
+def log(message):
+    """Write a daemon log line to stderr."""
+    print(f"hook_daemon: {message}", file=sys.stderr, flush=True)
+
+
+def preload_modules():
+    """Import the hooks' shared modules and dependencies ahead of time."""
+    sys.path[0:0] = [str(HOOKS_DIR), str(HOOKS_DIR / 'shared')]
+
+    import importlib
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            log(f"could not preload {name}: {e}")
+
+
+def get_hook_code(hook_path):
+    """
+    Compile a hook script, reusing the cached code while the file is unchanged.
+
+    Args:
+        hook_path: Path to the hook script
+
+    Returns:
+        Code object for the script
+    """
+    mtime_ns = hook_path.stat().st_mtime_ns
+    cached = _CODE_CACHE.get(hook_path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    code = compile(hook_path.read_bytes(), str(hook_path), 'exec')
+    _CODE_CACHE[hook_path] = (mtime_ns, code)
+    return code
+
+
+def resolve_hook(name):
+    """
+    Map a requested hook name to a script in the hooks directory.
+
+    Only `.py` files directly inside the hooks directory can be run.
+
+    Returns:
+        Path to the hook script, or None if the name is not a hook
+    """
+    if not name.endswith('.py') or os.path.basename(name) != name:
+        return None
+
+    hook_path = HOOKS_DIR / name
+    return hook_path if hook_path.is_file() else None
+
+
+def read_request(conn):
+    """
+    Read a client request: a JSON header line plus stdin/stdout/stderr fds.
+
+    Returns:
+        (header dict, [stdin_fd, stdout_fd, stderr_fd])
+    """
+    from json_codec import loads
+
+    conn.settimeout(REQUEST_TIMEOUT)
+    data, fds, _flags, _addr = socket.recv_fds(conn, 1 << 16, 3)
+    try:
+        while not data.endswith(b'\n'):
+            if len(data) > MAX_HEADER_BYTES:
+                raise ValueError('request header too large')
+            chunk = conn.recv(1 << 16)
+            if not chunk:
+                raise ValueError('connection closed mid-request')
+            data += chunk
+
+        if len(fds) != 3:
+            raise ValueError(f'expected 3 file descriptors, got {len(fds)}')
+
+        return loads(data), fds
+    except Exception:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+def run_hook(hook_path, header, fds):
+    """
+    Run a hook script in the current (forked) process and exit.
+
+    The client's descriptors replace fds 0-2 and its argv, cwd and
+    environment are installed before the script runs as __main__.
+    """
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    os.chdir(header.get('cwd') or '/')
+    os.environ.clear()
+    os.environ.update(
+        entry.split('=', 1) for entry in header.get('env', []) if '=' in entry
+    )
+    sys.argv = [str(hook_path)] + list(header.get('args', []))
+
+    try:
+        exec(get_hook_code(hook_path), {
+            '__name__': '__main__',
+            '__file__': str(hook_path),
+            '__builtins__': builtins,
+        })
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def send_exit_code(conn, status):
+    """Report a child's wait status to its client as a decimal exit code."""
+    code = os.waitstatus_to_exitcode(status)
+    try:
+        conn.sendall(f'{code if code >= 0 else 1}\n'.encode())
+    except OSError:
+        pass  # Client gave up (e.g. hook timeout)
+    finally:
+        conn.close()
+
+
+def bind_socket(socket_path):
+    """
+    Create the listening socket, replacing a stale socket file.
+
+    Exits if another daemon is already serving socket_path.
+    """
+    if socket_path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+            log(f"already running on {socket_path}")
+            sys.exit(1)
+        except OSError:
+            socket_path.unlink()
+        finally:
+            probe.close()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        listener.bind(str(socket_path))
+    finally:
+        os.umask(old_umask)
+    listener.listen(64)
+    return listener
+
+
+def serve(socket_path):
+    """Accept hook requests until SIGTERM/SIGINT."""
+    listener = bind_socket(socket_path)
+
+    # SIGCHLD wakes the select loop through a self-pipe so finished hooks
+    # are reported without a thread per request
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    def stop(*_):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    pending = {}  # child pid -> client connection
+    log(f"serving {HOOKS_DIR} on {socket_path}")
+
+    try:
+        while True:
+            try:
+                readable, _, _ = select.select([listener, wake_r], [], [])
+            except InterruptedError:
+                continue
+
+            if wake_r in readable:
+                try:
+                    while os.read(wake_r, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+
+            # Reap every finished hook and report its exit code
+            while pending:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+                conn = pending.pop(pid, None)
+                if conn is not None:
+                    send_exit_code(conn, status)
+
+            if listener not in readable:
+                continue
+
+            conn, _ = listener.accept()
+            try:
+                header, fds = read_request(conn)
+                hook_path = resolve_hook(header.get('hook', ''))
+                if hook_path is None:
+                    for fd in fds:
+                        os.close(fd)
+                    raise ValueError(f"unknown hook: {header.get('hook')!r}")
+                get_hook_code(hook_path)
+            except Exception as e:
+                log(f"rejected request: {e}")
+                conn.close()
+                continue
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                listener.close()
+                conn.close()
+                os.close(wake_r)
+                os.close(wake_w)
+                for other in pending.values():
+                    other.close()
+                run_hook(hook_path, header, fds)
+
+            for fd in fds:
+                os.close(fd)
+            pending[pid] = conn
+    except KeyboardInterrupt:
+        log("shutting down")
+    finally:
+        listener.close()
+        try:
+            socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve Claude Code hooks from a long-lived process')
+    parser.add_argument('--socket', default=os.environ.get('CLAUDE_HOOK_DAEMON_SOCKET', str(DEFAULT_SOCKET)),
+                        help=f'UNIX socket path (default: {DEFAULT_SOCKET})')
+    args = parser.parse_args()
+
+    preload_modules()
+    serve(Path(args.socket))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+// hook-client - Forwards a Claude Code hook invocation to the hook daemon
+//
+// Usage: hook-client <hook-script> [args...]
+//
+// The client connects to the daemon's UNIX socket, hands over its
+// stdin/stdout/stderr file descriptors together with argv, cwd and the
+// environment, waits for the hook's exit code and exits with it. If the
+// daemon is not running, it execs `uv run --script <hook-script> [args...]`
+// so the hook behaves exactly as it would without the daemon.
+package main
+
+import (
+	"bufio"
+	"encoding/json"
+	"fmt"
+	"net"
+	"os"
+	"os/exec"
+	"path/filepath"
+	"strconv"
+	"strings"
+	"syscall"
+)
+
+// HookRequest is the header sent to the daemon ahead of the file descriptors
+type HookRequest struct {
+	Hook string   `json:"hook"`
+	Args []string `json:"args"`
+	Cwd  string   `json:"cwd"`
+	Env  []string `json:"env"`
+}
+
+func main() {
+	if len(os.Args) < 2 {
+		fmt.Fprintln(os.Stderr, "usage: hook-client <hook-script> [args...]")
+		os.Exit(1)
+	}
+
+	hookPath := os.Args[1]
+	args := os.Args[2:]
+
+	code, err := runViaDaemon(hookPath, args)
+	if err != nil {
+		runDirect(hookPath, args)
+	}
+	os.Exit(code)
+}
+
+// socketPath returns the daemon socket serving the hook's directory
+func socketPath(hookPath string) string {
+	if path := os.Getenv("CLAUDE_HOOK_DAEMON_SOCKET"); path != "" {
+		return path
+	}
+	return filepath.Join(filepath.Dir(hookPath), "daemon", "hook_daemon.sock")
+}
+
+// runViaDaemon sends the hook invocation to the daemon and returns its exit
+// code. An error means the request never reached the daemon, so the caller
+// can safely fall back to running the hook directly.
+func runViaDaemon(hookPath string, args []string) (int, error) {
+	conn, err := net.DialUnix("unix", nil, &net.UnixAddr{Name: socketPath(hookPath), Net: "unix"})
+	if err != nil {
+		return 0, err
+	}
+	defer conn.Close()
+
+	cwd, _ := os.Getwd()
+	header, err := json.Marshal(HookRequest{
+		Hook: filepath.Base(hookPath),
+		Args: args,
+		Cwd:  cwd,
+		Env:  os.Environ(),
+	})
+	if err != nil {
+		return 0, err
+	}
+	header = append(header, '\n')
+
+	n, _, err := conn.WriteMsgUnix(header, syscall.UnixRights(0, 1, 2), nil)
+	if err != nil {
+		return 0, err
+	}
+
+	// From here on the daemon owns our stdin; never fall back to a direct run
+	if n < len(header) {
+		if _, err := conn.Write(header[n:]); err != nil {
+			return 0, nil
+		}
+	}
+
+	reply, err := bufio.NewReader(conn).ReadString('\n')
+	if err != nil {
+		fmt.Fprintf(os.Stderr, "hook-client: no exit code from daemon: %v\n", err)
+		return 0, nil
+	}
+
+	code, err := strconv.Atoi(strings.TrimSpace(reply))
+	if err != nil {
+		return 0, nil
+	}
+	return code, nil
+}
+
+// runDirect replaces this process with `uv run --script <hook> [args...]`
+func runDirect(hookPath string, args []string) {
+	uv, err := exec.LookPath("uv")
+	if err != nil {
+		fmt.Fprintf(os.Stderr, "hook-client: daemon unavailable and uv not found: %v\n", err)
+		os.Exit(1)
+	}
+
+	argv := append([]string{"uv", "run", "--script", hookPath}, args...)
+	err = syscall.Exec(uv, argv, os.Environ())
+	fmt.Fprintf(os.Stderr, "hook-client: exec %s: %v\n", uv, err)
+	os.Exit(1)
+}
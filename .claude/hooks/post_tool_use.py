@@ -1,96 +1,81 @@
 #!/usr/bin/env -S uv run --script
 # /// script
 # requires-python = ">=3.8"
+# dependencies = [
+#     "orjson",
+# ]
 # ///
 
-import json
 import os
 import sys
-from pathlib import Path
-from utils.constants import ensure_session_log_dir
 
 # Add shared utilities to path for Tier 1 metadata
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'shared'))
 
-try:
-    from metadata_collector import MetadataCollector
-    TIER1_AVAILABLE = True
-except ImportError:
-    TIER1_AVAILABLE = False
+from json_codec import loads, JSONDecodeError
+from utils.constants import ensure_session_log_dir
+from utils.session_log import append_log_entry
 
 def main():
     try:
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = loads(sys.stdin.buffer.read())
         
         # Extract session_id
         session_id = input_data.get('session_id', 'unknown')
         
         # Ensure session log directory exists
         log_dir = ensure_session_log_dir(session_id)
-        log_path = log_dir / 'post_tool_use.json'
-        
-        # Read existing log data or initialize empty list
-        if log_path.exists():
-            with open(log_path, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-        
-        # Append new data
-        log_data.append(input_data)
 
-        # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        # Append this entry to the session's JSON Lines log
+        append_log_entry(log_dir, 'post_tool_use', input_data)
 
         # Tier 1: Record tool end and calculate duration
-        if TIER1_AVAILABLE:
-            try:
-                project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.getcwd())
-                tool_name = input_data.get('tool_name', '')
+        try:
+            from metadata_collector import get_collector
 
-                collector = MetadataCollector(project_dir)
+            project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.getcwd())
+            tool_name = input_data.get('tool_name', '')
 
-                # Track TodoWrite updates
-                if tool_name == 'TodoWrite':
-                    tool_input = input_data.get('tool_input', {})
-                    todos = tool_input.get('todos', [])
-                    if todos:
-                        try:
-                            collector.record_todos(session_id, todos)
-                            # Debug: log success
-                            debug_file = log_dir / 'todo_tracking_debug.log'
-                            with open(debug_file, 'a') as df:
-                                df.write(f"✓ Recorded {len(todos)} todos for session {session_id[:8]}\n")
-                        except Exception as e:
-                            # Debug: log error
-                            debug_file = log_dir / 'todo_tracking_debug.log'
-                            with open(debug_file, 'a') as df:
-                                df.write(f"✗ Error recording todos: {e}\n")
-                            raise
+            collector = get_collector(project_dir)
 
-                duration_ms = collector.record_tool_end(session_id, tool_name)
+            # Track TodoWrite updates
+            if tool_name == 'TodoWrite':
+                tool_input = input_data.get('tool_input', {})
+                todos = tool_input.get('todos', [])
+                if todos:
+                    try:
+                        collector.record_todos(session_id, todos)
+                        # Debug: log success
+                        debug_file = log_dir / 'todo_tracking_debug.log'
+                        with open(debug_file, 'a') as df:
+                            df.write(f"✓ Recorded {len(todos)} todos for session {session_id[:8]}\n")
+                    except Exception as e:
+                        # Debug: log error
+                        debug_file = log_dir / 'todo_tracking_debug.log'
+                        with open(debug_file, 'a') as df:
+                            df.write(f"✗ Error recording todos: {e}\n")
+                        raise
 
-                # Store duration in a temp file for send_event to pick up
-                if duration_ms is not None:
-                    duration_file = log_dir / 'last_tool_duration.json'
-                    with open(duration_file, 'w') as f:
-                        json.dump({
-                            'tool_name': tool_name,
-                            'duration_ms': duration_ms,
-                            'timestamp': input_data.get('timestamp', '')
-                        }, f)
-            except Exception:
-                # Silently fail to not block tool execution
-                pass
+            # Track Skill invocations
+            elif tool_name == 'Skill':
+                skill_name = input_data.get('tool_input', {}).get('skill')
+                if skill_name:
+                    collector.record_skill(session_id, skill_name)
 
-        sys.exit(0)
+            # Records the duration in session state for send_event to pick up
+            collector.record_tool_end(session_id, tool_name)
+            collector.flush()
+        except Exception:
+            # Silently fail (including a missing collector) to not block tool execution
+            pass
+
+        # Skip interpreter teardown: everything has been written and closed
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
         
-    except json.JSONDecodeError:
+    except JSONDecodeError:
         # Handle JSON decode errors gracefully
         sys.exit(0)
     except Exception:
@@ -1,81 +1,187 @@
 #!/usr/bin/env -S uv run --script
 # /// script
 # requires-python = ">=3.8"
+# dependencies = [
+#     "orjson",
+# ]
 # ///
 
-import json
 import sys
 import os
 import re
-from pathlib import Path
-from utils.constants import ensure_session_log_dir
+import shlex
 
 # Add shared utilities to path for Tier 1 metadata
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'shared'))
 
-try:
-    from metadata_collector import MetadataCollector
-    TIER1_AVAILABLE = True
-except ImportError:
-    TIER1_AVAILABLE = False
+from json_codec import loads, JSONDecodeError
+from utils.constants import ensure_session_log_dir
+from utils.session_log import append_log_entry
 
 # Allowed directories where rm -rf is permitted
 ALLOWED_RM_DIRECTORIES = [
     'trees/',
 ]
 
-def is_path_in_allowed_directory(command, allowed_dirs):
-    """
-    Check if the rm command targets paths exclusively within allowed directories.
-    Returns True if all paths in the command are within allowed directories.
+# Literal rm targets that are never safe to delete recursively
+DANGEROUS_RM_PATHS = frozenset({
+    '/', '/*',          # Root directory
+    '~', '~/', '~/*',   # Home directory
+    '$HOME', '$HOME/',  # Home environment variable
+    '.', './', './*',   # Current directory
+    '..', '../',        # Parent directory
+    '*',                # Wildcard
+})
+
+# Target prefixes that make a recursive rm dangerous
+_DANGEROUS_RM_PREFIXES = ('/', '~', '$HOME')
+
+# Commands with an rm subcommand that is not /bin/rm (git rm -r --cached ...)
+_RM_SUBCOMMAND_HOSTS = frozenset({'git'})
+
+# Shells whose -c script (or eval arguments) must be checked as well
+_SHELL_COMMANDS = frozenset({'sh', 'bash', 'zsh', 'dash', 'ksh'})
+
+# Shell operators that start a new simple command
+_CONTROL_OPERATORS = frozenset({';', ';;', '&', '&&', '|', '||', '|&', '(', ')'})
+_SHELL_PUNCTUATION = frozenset('();<>|&')
+
+# .env file access (but allow .env.sample)
+_ENV_RE = re.compile('|'.join([
+    r'\b\.env\b(?!\.sample)',  # .env but not .env.sample
+    r'cat\s+.*\.env\b(?!\.sample)',  # cat .env
+    r'echo\s+.*>\s*\.env\b(?!\.sample)',  # echo > .env
+    r'touch\s+.*\.env\b(?!\.sample)',  # touch .env
+    r'cp\s+.*\.env\b(?!\.sample)',  # cp .env
+    r'mv\s+.*\.env\b(?!\.sample)',  # mv .env
+]))
+
+def split_shell_commands(command):
     """
-    # Extract the path portion after rm and its flags
-    # Pattern: rm [flags] path1 path2 ...
-    path_pattern = r'rm\s+(?:-[\w]+\s+|--[\w-]+\s+)*(.+)$'
-    match = re.search(path_pattern, command, re.IGNORECASE)
+    Tokenize a shell command line into simple commands.
 
-    if not match:
-        return False
+    Control operators (;, &&, ||, |, &), subshells and backtick substitutions
+    start a new command and redirections are dropped together with their
+    target. Falls back to whitespace splitting if the command has unbalanced
+    quotes.
 
-    path_str = match.group(1).strip()
+    Returns:
+        List of argv lists, one per simple command
+    """
+    command = command.replace('`', ' ; ')
+    try:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+    except ValueError:
+        tokens = command.split()
+
+    commands = [[]]
+    skip_next = False
+    for token in tokens:
+        if skip_next:
+            skip_next = False
+        elif token in _CONTROL_OPERATORS:
+            commands.append([])
+        elif set(token) <= _SHELL_PUNCTUATION:
+            # Redirection (>, >>, 2>&1, ...): skip the operator and its target
+            skip_next = True
+            if commands[-1] and commands[-1][-1].isdigit():
+                commands[-1].pop()
+        else:
+            commands[-1].append(token)
 
-    # Split by spaces to get individual paths (simple approach)
-    # This might not handle all edge cases but works for common usage
-    paths = path_str.split()
+    return [argv for argv in commands if argv]
 
+def is_path_in_allowed_directory(paths, allowed_dirs):
+    """
+    Check if rm targets are exclusively within allowed directories.
+    Returns True if all paths are within allowed directories.
+    """
     if not paths:
         return False
 
-    # Check if all paths are within allowed directories
     for path in paths:
-        # Remove quotes
-        path = path.strip('\'"')
-
-        # Skip if empty
-        if not path:
-            continue
-
-        # Check if this path is within any allowed directory
-        is_allowed = False
-        for allowed_dir in allowed_dirs:
-            # Check various formats:
-            # - trees/something
-            # - ./trees/something
-            if path.startswith(allowed_dir) or path.startswith('./' + allowed_dir):
-                is_allowed = True
-                break
-
-        # If any path is not in allowed directories, return False
-        if not is_allowed:
+        # Check various formats:
+        # - trees/something
+        # - ./trees/something
+        if '..' in path:
+            return False
+        if not any(path.startswith(d) or path.startswith('./' + d) for d in allowed_dirs):
             return False
 
     # All paths are within allowed directories
     return True
 
+def is_dangerous_rm_invocation(argv, allowed_dirs):
+    """
+    Check a single tokenized rm invocation (argv[0] is rm).
+
+    Returns:
+        True if the invocation is recursive and forced, or recursive with a
+        dangerous target, and does not target only allowed directories.
+    """
+    short_flags = ''
+    long_flags = set()
+    paths = []
+    end_of_options = False
+    for arg in argv[1:]:
+        if end_of_options or arg == '-' or not arg.startswith('-'):
+            paths.append(arg)
+        elif arg == '--':
+            end_of_options = True
+        elif arg.startswith('--'):
+            long_flags.add(arg.lower())
+        else:
+            short_flags += arg[1:].lower()
+
+    recursive = 'r' in short_flags or '--recursive' in long_flags
+    if not recursive:
+        return False
+
+    force = 'f' in short_flags or '--force' in long_flags or '--no-preserve-root' in long_flags
+    dangerous_target = any(
+        p in DANGEROUS_RM_PATHS or p.startswith(_DANGEROUS_RM_PREFIXES) or '..' in p or '*' in p
+        for p in paths
+    )
+    if not (force or dangerous_target):
+        return False
+
+    # It's dangerous - unless it targets only allowed directories
+    return not (allowed_dirs and is_path_in_allowed_directory(paths, allowed_dirs))
+
+def shell_script_argument(argv):
+    """
+    Return the -c script of a shell invocation (argv[0] is the shell).
+
+    Option clusters containing c (-lc, -ec, -xc) count as -c, and the script
+    is the first non-option argument after them.
+
+    Returns:
+        The script string, or None if the shell is not run with -c
+    """
+    has_script_flag = False
+    skip_next = False
+    for arg in argv[1:]:
+        if skip_next:
+            skip_next = False
+        elif arg.startswith('--'):
+            continue
+        elif arg.startswith(('-', '+')) and len(arg) > 1:
+            has_script_flag = has_script_flag or 'c' in arg[1:]
+            # -o/-O take an option name (bash -o pipefail -c ...)
+            skip_next = arg[-1] in 'oO'
+        else:
+            return arg if has_script_flag else None
+    return None
+
 def is_dangerous_rm_command(command, allowed_dirs=None):
     """
     Comprehensive detection of dangerous rm commands.
-    Matches various forms of rm -rf and similar destructive patterns.
+    Matches recursive forced deletes (rm -rf, rm -r -f, rm --recursive --force)
+    and recursive deletes of dangerous targets (/, ~, $HOME, .., wildcards),
+    including rm run through wrappers (sudo, nice, timeout, find -exec),
+    inside shell groups and keywords, or later in a command chain.
     Returns False if the command targets only allowed directories.
 
     Args:
@@ -88,57 +194,26 @@ def is_dangerous_rm_command(command, allowed_dirs=None):
     if allowed_dirs is None:
         allowed_dirs = []
 
-    # Normalize command by removing extra spaces and converting to lowercase
-    normalized = ' '.join(command.lower().split())
-
-    # Pattern 1: Standard rm -rf variations
-    patterns = [
-        r'\brm\s+.*-[a-z]*r[a-z]*f',  # rm -rf, rm -fr, rm -Rf, etc.
-        r'\brm\s+.*-[a-z]*f[a-z]*r',  # rm -fr variations
-        r'\brm\s+--recursive\s+--force',  # rm --recursive --force
-        r'\brm\s+--force\s+--recursive',  # rm --force --recursive
-        r'\brm\s+-r\s+.*-f',  # rm -r ... -f
-        r'\brm\s+-f\s+.*-r',  # rm -f ... -r
-    ]
-
-    # Check for dangerous patterns
-    is_potentially_dangerous = False
-    for pattern in patterns:
-        if re.search(pattern, normalized):
-            is_potentially_dangerous = True
-            break
-
-    # If not found in Pattern 1, check Pattern 2
-    if not is_potentially_dangerous:
-        # Pattern 2: Check for rm with recursive flag targeting dangerous paths
-        dangerous_paths = [
-            r'/',           # Root directory
-            r'/\*',         # Root with wildcard
-            r'~',           # Home directory
-            r'~/',          # Home directory path
-            r'\$HOME',      # Home environment variable
-            r'\.\.',        # Parent directory references
-            r'\*',          # Wildcards in general rm -rf context
-            r'\.',          # Current directory
-            r'\.\s*$',      # Current directory at end of command
-        ]
-
-        if re.search(r'\brm\s+.*-[a-z]*r', normalized):  # If rm has recursive flag
-            for path in dangerous_paths:
-                if re.search(path, normalized):
-                    is_potentially_dangerous = True
-                    break
-
-    # If not potentially dangerous at all, it's safe
-    if not is_potentially_dangerous:
-        return False
-
-    # It's potentially dangerous - check if targeting only allowed directories
-    if allowed_dirs and is_path_in_allowed_directory(command, allowed_dirs):
-        return False  # Allowed directory, so not dangerous
+    for argv in split_shell_commands(command):
+        # Check every rm in the command, not just the command word: wrapper
+        # options (sudo -u root, nice -n 10, timeout 5), shell keywords
+        # ({, then, do) and find -exec all put rm further into argv.
+        for i, arg in enumerate(argv):
+            name = os.path.basename(arg).lower()
+            if name == 'rm':
+                if i and argv[i - 1] in _RM_SUBCOMMAND_HOSTS:
+                    continue
+                if is_dangerous_rm_invocation(argv[i:], allowed_dirs):
+                    return True
+            elif name == 'eval':
+                if is_dangerous_rm_command(' '.join(argv[i + 1:]), allowed_dirs):
+                    return True
+            elif name in _SHELL_COMMANDS:
+                script = shell_script_argument(argv[i:])
+                if script is not None and is_dangerous_rm_command(script, allowed_dirs):
+                    return True
 
-    # Dangerous and not in allowed directories
-    return True
+    return False
 
 def is_env_file_access(tool_name, tool_input):
     """
@@ -154,26 +229,15 @@ def is_env_file_access(tool_name, tool_input):
         # Check bash commands for .env file access
         elif tool_name == 'Bash':
             command = tool_input.get('command', '')
-            # Pattern to detect .env file access (but allow .env.sample)
-            env_patterns = [
-                r'\b\.env\b(?!\.sample)',  # .env but not .env.sample
-                r'cat\s+.*\.env\b(?!\.sample)',  # cat .env
-                r'echo\s+.*>\s*\.env\b(?!\.sample)',  # echo > .env
-                r'touch\s+.*\.env\b(?!\.sample)',  # touch .env
-                r'cp\s+.*\.env\b(?!\.sample)',  # cp .env
-                r'mv\s+.*\.env\b(?!\.sample)',  # mv .env
-            ]
-            
-            for pattern in env_patterns:
-                if re.search(pattern, command):
-                    return True
+            if _ENV_RE.search(command):
+                return True
     
     return False
 
 def main():
     try:
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = loads(sys.stdin.buffer.read())
         
         tool_name = input_data.get('tool_name', '')
         tool_input = input_data.get('tool_input', {})
@@ -200,38 +264,29 @@ def main():
         
         # Ensure session log directory exists
         log_dir = ensure_session_log_dir(session_id)
-        log_path = log_dir / 'pre_tool_use.json'
-        
-        # Read existing log data or initialize empty list
-        if log_path.exists():
-            with open(log_path, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-        
-        # Append new data
-        log_data.append(input_data)
-
-        # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
-
-        # Tier 1: Record tool start for duration tracking
-        if TIER1_AVAILABLE:
-            try:
-                project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.getcwd())
-                collector = MetadataCollector(project_dir)
-                collector.record_tool_start(session_id, tool_name, tool_input)
-            except Exception:
-                # Silently fail to not block tool execution
-                pass
 
-        sys.exit(0)
+        # Append this entry to the session's JSON Lines log
+        append_log_entry(log_dir, 'pre_tool_use', input_data)
+
+        # Tier 1: Record tool start for duration tracking. Imported here so
+        # blocked commands never pay for loading the collector.
+        try:
+            from metadata_collector import get_collector
+
+            project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.getcwd())
+            collector = get_collector(project_dir)
+            collector.record_tool_start(session_id, tool_name, tool_input)
+            collector.flush()
+        except Exception:
+            # Silently fail (including a missing collector) to not block tool execution
+            pass
+
+        # Skip interpreter teardown: everything has been written and closed
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
         
-    except json.JSONDecodeError:
+    except JSONDecodeError:
         # Gracefully handle JSON decode errors
         sys.exit(0)
     except Exception:
@@ -4,6 +4,7 @@
 # dependencies = [
 #     "anthropic",
 #     "python-dotenv",
+#     "orjson",
 # ]
 # ///
 
@@ -17,155 +18,484 @@ Enhanced with Tier 0 metadata collection:
 - Environment context (OS, shell, Python/Node versions)
 """
 
-import json
 import sys
 import os
-import argparse
-import urllib.request
-import urllib.error
-from datetime import datetime
+import time
+import fcntl
 
 # Add shared utilities to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'shared'))
 
-from utils.summarizer import generate_event_summary
-from utils.model_extractor import get_model_from_transcript
-from utils.constants import ensure_session_log_dir
+from json_codec import dumps, dumps_with_raw, loads, JSONDecodeError
 
-try:
-    from metadata_collector import MetadataCollector
-    METADATA_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: Could not import MetadataCollector: {e}", file=sys.stderr)
-    METADATA_AVAILABLE = False
+# Heavier modules (http.client, the metadata collector, the
+# summarizer) are imported where they are used: the hook itself never
+# touches the network, and the flush worker never collects metadata.
 
-try:
-    from tool_metadata_parser import ToolMetadataParser
-    PARSER_AVAILABLE = True
-except ImportError:
-    PARSER_AVAILABLE = False
+# Maximum number of queued events sent per POST /events/batch request
+QUEUE_BATCH_SIZE = 256
+
+# Reused keep-alive connection to the server: ((scheme, host, port), HTTPConnection)
+_CONNECTION = None
+
+# Append-only queue file descriptor, opened on first use
+_QUEUE_FD = None
+
+# Minimum seconds between cleanup_old_sessions runs
+CLEANUP_INTERVAL_SECONDS = 3600
+
+def get_data_dir():
+    """Get the project-local .claude/data directory, creating it if needed."""
+    from pathlib import Path
+    project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.getcwd())
+    data_dir = Path(project_dir) / '.claude' / 'data'
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
 
 def get_queue_file():
     """Get the path to the event queue file."""
-    from pathlib import Path
     # Use project-local queue in .claude/data/
-    project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.getcwd())
-    queue_dir = Path(project_dir) / '.claude' / 'data'
-    queue_dir.mkdir(parents=True, exist_ok=True)
-    return queue_dir / 'event_queue.jsonl'
+    return get_data_dir() / 'event_queue.jsonl'
+
+def cleanup_due():
+    """
+    Check whether old sessions should be cleaned up, based on the mtime of
+    a marker file. Touches the marker when cleanup is due.
+    """
+    marker = get_data_dir() / '.last_cleanup'
+    try:
+        age = time.time() - marker.stat().st_mtime
+    except FileNotFoundError:
+        age = float('inf')
 
-def queue_event(event_data):
-    """Queue event for later delivery if server unavailable."""
+    if age > CLEANUP_INTERVAL_SECONDS:
+        marker.touch()
+        return True
+    return False
+
+def encode_event(event_data):
+    """Return the JSON bytes for an event, passing pre-encoded events through."""
+    return event_data if isinstance(event_data, bytes) else dumps(event_data)
+
+def open_queue_fd():
+    """
+    Return this process's append-only descriptor for the queue file.
+
+    The queue is written with raw os.write calls on an O_APPEND descriptor,
+    opened once per process. Queued events are disposable telemetry, so the
+    file is never fsynced; it is also not preallocated, since fallocate'd
+    space reads back as NUL bytes that would corrupt the JSON Lines file.
+    """
+    global _QUEUE_FD
+    if _QUEUE_FD is None:
+        _QUEUE_FD = os.open(get_queue_file(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    return _QUEUE_FD
+
+def queue_events(events):
+    """
+    Append events (dicts or pre-encoded JSON bytes) to the queue file in a
+    single write.
+
+    Holds an exclusive flock on the queue file so appends never interleave
+    with a worker claiming the queue.
+    """
     try:
-        queue_file = get_queue_file()
-        with open(queue_file, 'a') as f:
-            f.write(json.dumps(event_data) + '\n')
+        buf = memoryview(b''.join(encode_event(e) + b'\n' for e in events))
+        fd = open_queue_fd()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            while buf:
+                buf = buf[os.write(fd, buf):]
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
         return True
     except Exception as e:
         print(f"Failed to queue event: {e}", file=sys.stderr)
         return False
 
+def queue_event(event_data):
+    """Queue event for delivery by the flush worker."""
+    return queue_events([event_data])
+
+def claim_queued_events():
+    """
+    Take every queued event out of the queue file.
+
+    The file is read and truncated under its flock, so events appended
+    while the caller is sending land in the (now empty) queue instead of
+    being overwritten. Events are returned still encoded; the flush path
+    never needs to decode them.
+
+    Returns:
+        List of queued events as JSON bytes
+    """
+    try:
+        f = open(get_queue_file(), 'r+b')
+    except FileNotFoundError:
+        return []
+
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        data = f.read()
+        f.seek(0)
+        f.truncate()
+
+    return [line for line in data.split(b'\n') if line.strip()]
+
 def flush_queue(server_url='http://localhost:4000/events'):
-    """Attempt to send queued events."""
-    queue_file = get_queue_file()
-    if not queue_file.exists():
-        return
+    """
+    Attempt to send queued events.
+
+    Events the server rejects (4xx) are dropped rather than requeued, so a
+    single bad event cannot hold back everything queued after it.
+
+    Returns:
+        True if every claimed event was delivered or dropped, False if some
+        were requeued
+    """
+    try:
+        queued_events = claim_queued_events()
+    except Exception as e:
+        print(f"Failed to flush queue: {e}", file=sys.stderr)
+        return False
 
+    # Send queued events in batches, stopping at the first failed batch
+    remaining = queued_events
+    try:
+        while remaining:
+            batch = remaining[:QUEUE_BATCH_SIZE]
+            status = send_batch_to_server(batch, server_url)
+            if status == 200:
+                remaining = remaining[QUEUE_BATCH_SIZE:]
+                continue
+            if status is None or status >= 500:
+                break
+
+            # No batch endpoint (404 from older servers) or the batch was
+            # rejected: fall back to one request per event
+            if status == 404:
+                batch = remaining
+            undelivered = [e for e in batch if not deliver_event(e, server_url)]
+            remaining = undelivered + remaining[len(batch):]
+            if undelivered:
+                break
+    finally:
+        # Put undelivered events back for the next flush
+        if remaining:
+            queue_events(remaining)
+
+    return not remaining
+
+def deliver_event(event, server_url='http://localhost:4000/events'):
+    """
+    Send one encoded event without retrying.
+
+    Events that are not valid JSON or that the server rejects (4xx) are
+    dropped: resending them can never succeed.
+
+    Returns:
+        True if the event was delivered or dropped, False if it should be
+        kept for a later attempt
+    """
     try:
-        # Read queued events
-        with open(queue_file, 'r') as f:
-            queued_events = [json.loads(line.strip()) for line in f if line.strip()]
+        loads(event)
+    except JSONDecodeError:
+        print("Dropping queued event that is not valid JSON", file=sys.stderr)
+        return True
 
-        if not queued_events:
+    try:
+        status = post_json(server_url, event)
+    except Exception as e:
+        print(f"Failed to send event: {e}", file=sys.stderr)
+        return False
+
+    if 400 <= status < 500:
+        print(f"Dropping event rejected by server with status: {status}", file=sys.stderr)
+        return True
+    return status == 200
+
+def read_transcript_array(transcript_path):
+    """
+    Read a .jsonl transcript as a JSON array without decoding its entries.
+
+    Lines are spliced together as-is after checking that they parse. A
+    trailing line that is still being written (no newline yet) and lines
+    that are not valid JSON objects are dropped so the result stays valid
+    JSON.
+
+    Returns:
+        JSON array bytes
+    """
+    with open(transcript_path, 'rb') as f:
+        raw = f.read()
+
+    if not raw.endswith(b'\n'):
+        raw = raw[:raw.rfind(b'\n') + 1]
+
+    lines = []
+    for line in raw.split(b'\n'):
+        line = line.strip()
+        if not line.startswith(b'{'):
+            continue
+        try:
+            loads(line)
+        except JSONDecodeError:
+            continue
+        lines.append(line)
+
+    return b'[' + b','.join(lines) + b']'
+
+def drain_queue(server_url='http://localhost:4000/events', max_retries=3):
+    """
+    Flush worker entry point: deliver queued events with retry logic.
+
+    Only one worker drains the queue at a time; others exit immediately
+    since the running worker also picks up events queued while it works.
+    """
+    with open(get_data_dir() / 'event_queue.lock', 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
             return
 
-        # Try to send each queued event
-        successful = []
-        for i, event in enumerate(queued_events):
-            if send_event_to_server(event, server_url, retry=False):
-                successful.append(i)
+        attempt = 0
+        while attempt < max_retries:
+            if flush_queue(server_url):
+                try:
+                    if get_queue_file().stat().st_size == 0:
+                        return
+                except FileNotFoundError:
+                    return
+                # More events were queued while sending
+                continue
+
+            # Exponential backoff: 0.5s, 1s, 2s
+            time.sleep(0.5 * (2 ** attempt))
+            attempt += 1
+
+def spawn_flush_worker(server_url='http://localhost:4000/events', event=None):
+    """
+    Start a detached worker process that drains the event queue.
 
-        # Remove successfully sent events from queue
-        if successful:
-            remaining = [e for i, e in enumerate(queued_events) if i not in successful]
-            with open(queue_file, 'w') as f:
-                for event in remaining:
-                    f.write(json.dumps(event) + '\n')
+    If given, the encoded event is handed to the worker on its stdin and
+    sent directly, so it does not wait behind older queued events.
+    """
+    import subprocess
+    try:
+        worker = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--flush-queue', '--server-url', server_url],
+            stdin=subprocess.DEVNULL if event is None else subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError as e:
+        print(f"Failed to start flush worker: {e}", file=sys.stderr)
+        return False
 
-            # If queue is now empty, delete the file
-            if not remaining:
-                queue_file.unlink()
+    if event is not None:
+        try:
+            with worker.stdin:
+                worker.stdin.write(event)
+        except OSError:
+            # The worker died before taking the event: leave it to the next flush
+            queue_event(event)
+    return True
+
+def close_connection():
+    """Close the reused server connection, if any."""
+    global _CONNECTION
+    if _CONNECTION is not None:
+        _CONNECTION[1].close()
+        _CONNECTION = None
+
+def post_json(server_url, body, timeout=5):
+    """
+    POST a JSON body to server_url over a reused keep-alive connection.
+
+    A stale keep-alive socket (closed by the server between requests) is
+    retried once on a fresh connection.
+
+    Returns:
+        HTTP status code of the response
+    """
+    import http.client
+    from urllib.parse import urlsplit
+
+    global _CONNECTION
+    url = urlsplit(server_url)
+    key = (url.scheme, url.hostname, url.port)
+    path = (url.path or '/') + (f'?{url.query}' if url.query else '')
+
+    while True:
+        reused = _CONNECTION is not None and _CONNECTION[0] == key
+        if not reused:
+            close_connection()
+            conn_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            _CONNECTION = (key, conn_class(url.hostname, url.port, timeout=timeout))
+
+        conn = _CONNECTION[1]
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
 
+        try:
+            conn.request('POST', path, body=body, headers={
+                'Content-Type': 'application/json',
+                'User-Agent': 'Claude-Code-Hook/1.0',
+                'Connection': 'keep-alive'
+            })
+            response = conn.getresponse()
+            response.read()
+            if response.will_close:
+                close_connection()
+            return response.status
+        except (ConnectionResetError, BrokenPipeError):
+            close_connection()
+            if not reused:
+                raise
+        except Exception:
+            close_connection()
+            raise
+
+def send_batch_to_server(events, server_url='http://localhost:4000/events'):
+    """
+    Send a list of events to the server's batch endpoint in one request.
+
+    Returns:
+        HTTP status code of the response (404 if the server has no batch
+        endpoint), or None if the request failed
+    """
+    try:
+        body = b'[' + b','.join(encode_event(e) for e in events) + b']'
+        status = post_json(server_url.rstrip('/') + '/batch', body, timeout=10)
+        if status not in (200, 404):
+            print(f"Batch send failed with status: {status}", file=sys.stderr)
+        return status
     except Exception as e:
-        print(f"Failed to flush queue: {e}", file=sys.stderr)
+        print(f"Failed to send event batch: {e}", file=sys.stderr)
+    return None
 
 def send_event_to_server(event_data, server_url='http://localhost:4000/events', retry=True, max_retries=3):
-    """Send event data to the observability server with retry logic."""
-    import time
+    """
+    Send event data (a dict or pre-encoded JSON bytes) to the observability
+    server with retry logic.
+    """
+    import http.client
 
+    body = encode_event(event_data)
     for attempt in range(max_retries if retry else 1):
         try:
-            # Prepare the request
-            req = urllib.request.Request(
-                server_url,
-                data=json.dumps(event_data).encode('utf-8'),
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'Claude-Code-Hook/1.0'
-                }
-            )
+            status = post_json(server_url, body)
+            if status == 200:
+                # Success! Try to flush any queued events
+                if retry:
+                    flush_queue(server_url)
+                return True
+            error = f"server returned status {status}"
 
-            # Send the request
-            with urllib.request.urlopen(req, timeout=5) as response:
-                if response.status == 200:
-                    # Success! Try to flush any queued events
-                    if retry:
-                        flush_queue(server_url)
-                    return True
-                else:
-                    print(f"Server returned status: {response.status}", file=sys.stderr)
-
-        except urllib.error.URLError as e:
-            if attempt < max_retries - 1 and retry:
-                # Exponential backoff: 0.5s, 1s, 2s
-                wait_time = 0.5 * (2 ** attempt)
-                time.sleep(wait_time)
-                continue
-            else:
-                print(f"Failed to send event after {attempt + 1} attempts: {e}", file=sys.stderr)
+        except (OSError, http.client.HTTPException) as e:
+            error = e
 
         except Exception as e:
             print(f"Unexpected error: {e}", file=sys.stderr)
             break
 
+        if attempt < max_retries - 1 and retry:
+            # Exponential backoff: 0.5s, 1s, 2s
+            wait_time = 0.5 * (2 ** attempt)
+            time.sleep(wait_time)
+        else:
+            print(f"Failed to send event after {attempt + 1} attempts: {error}", file=sys.stderr)
+
     # All retries failed - queue the event for later
     if retry:
-        queue_event(event_data)
+        queue_event(body)
 
     return False
 
+# Command line flags and their defaults; flags defaulting to False take no value
+ARG_DEFAULTS = {
+    'source_app': None,      # Source application name (auto-detected if not provided)
+    'event_type': None,      # Hook event type (PreToolUse, PostToolUse, etc.)
+    'server_url': 'http://localhost:4000/events',
+    'add_chat': False,       # Include chat transcript if available
+    'summarize': False,      # Generate AI summary of the event
+    'agent_type': 'claude',  # Type of AI agent generating this event
+    'agent_version': None,   # Agent CLI version (e.g., "0.64.0" for Codex)
+    'flush_queue': False,    # Send the event on stdin, deliver queued events and exit (used by the background worker)
+}
+
+AGENT_TYPES = ('claude', 'codex', 'gemini', 'custom')
+
+USAGE = (
+    "usage: send_event.py --event-type EVENT_TYPE [--source-app SOURCE_APP] "
+    "[--server-url SERVER_URL] [--add-chat] [--summarize] "
+    "[--agent-type {claude,codex,gemini,custom}] [--agent-version AGENT_VERSION] "
+    "[--flush-queue]"
+)
+
+def usage_error(message):
+    """Print usage and an error to stderr and exit with status 2, like argparse."""
+    print(USAGE, file=sys.stderr)
+    print(f"send_event.py: error: {message}", file=sys.stderr)
+    sys.exit(2)
+
+def parse_args(argv):
+    """
+    Parse command line flags without argparse.
+
+    Accepts `--flag value` and `--flag=value`; see ARG_DEFAULTS for the
+    supported flags.
+
+    Returns:
+        Namespace with one attribute per flag
+    """
+    from types import SimpleNamespace
+
+    args = dict(ARG_DEFAULTS)
+    it = iter(argv)
+    for arg in it:
+        if arg in ('-h', '--help'):
+            print(USAGE)
+            sys.exit(0)
+
+        flag, has_value, value = arg.partition('=')
+        name = flag[2:].replace('-', '_')
+        if not flag.startswith('--') or name not in ARG_DEFAULTS:
+            usage_error(f"unrecognized arguments: {arg}")
+
+        if ARG_DEFAULTS[name] is False:
+            if has_value:
+                usage_error(f"argument {flag}: ignored explicit argument '{value}'")
+            args[name] = True
+            continue
+
+        if not has_value:
+            value = next(it, None)
+            if value is None:
+                usage_error(f"argument {flag}: expected one argument")
+        args[name] = value
+
+    if args['agent_type'] not in AGENT_TYPES:
+        usage_error(f"argument --agent-type: invalid choice: '{args['agent_type']}' "
+                    f"(choose from {', '.join(AGENT_TYPES)})")
+
+    return SimpleNamespace(**args)
+
 def main():
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='Send Claude Code hook events to observability server')
-    parser.add_argument('--source-app', required=False, help='Source application name (auto-detected if not provided)')
-    parser.add_argument('--event-type', required=True, help='Hook event type (PreToolUse, PostToolUse, etc.)')
-    parser.add_argument('--server-url', default='http://localhost:4000/events', help='Server URL')
-    parser.add_argument('--add-chat', action='store_true', help='Include chat transcript if available')
-    parser.add_argument('--summarize', action='store_true', help='Generate AI summary of the event')
-
-    # Multi-agent support arguments
-    parser.add_argument('--agent-type',
-        type=str,
-        default='claude',
-        choices=['claude', 'codex', 'gemini', 'custom'],
-        help='Type of AI agent generating this event (default: claude)')
-
-    parser.add_argument('--agent-version',
-        type=str,
-        default=None,
-        help='Agent CLI version (e.g., "0.64.0" for Codex)')
-
-    args = parser.parse_args()
+    args = parse_args(sys.argv[1:])
+
+    if args.flush_queue:
+        # Send the event handed over by the hook, queueing it if that fails
+        event = b'' if sys.stdin.isatty() else sys.stdin.buffer.read()
+        if event and not deliver_event(event, args.server_url):
+            queue_event(event)
+        drain_queue(args.server_url)
+        sys.exit(0)
+
+    if not args.event_type:
+        usage_error('the following arguments are required: --event-type')
 
     # Auto-detect source_app from project directory if not provided
     if not args.source_app:
@@ -179,8 +509,8 @@ def main():
 
     try:
         # Read hook data from stdin
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError as e:
+        input_data = loads(sys.stdin.buffer.read())
+    except JSONDecodeError as e:
         print(f"Failed to parse JSON input: {e}", file=sys.stderr)
         sys.exit(1)
     
@@ -189,6 +519,7 @@ def main():
     transcript_path = input_data.get('transcript_path', '')
     model_name = ''
     if transcript_path:
+        from utils.model_extractor import get_model_from_transcript
         model_name = get_model_from_transcript(session_id, transcript_path)
 
     # Get project directory from environment
@@ -199,9 +530,15 @@ def main():
     tier1_metadata = {}
     tier2_metadata = {}
 
-    if METADATA_AVAILABLE:
+    try:
+        from metadata_collector import get_collector
+    except ImportError as e:
+        print(f"Warning: Could not import MetadataCollector: {e}", file=sys.stderr)
+        get_collector = None
+
+    if get_collector is not None:
         try:
-            collector = MetadataCollector(project_dir)
+            collector = get_collector(project_dir)
             tier0_metadata = collector.collect_tier0_metadata(session_id, model_name)
 
             # Increment tool count for PostToolUse events
@@ -213,20 +550,9 @@ def main():
             tool_input = input_data.get('tool_input', {})
             duration_ms = None
 
-            # For PostToolUse, try to read duration from temp file
+            # For PostToolUse, pick up the duration recorded by post_tool_use.py
             if args.event_type == 'PostToolUse':
-                try:
-                    log_dir = ensure_session_log_dir(session_id)
-                    duration_file = log_dir / 'last_tool_duration.json'
-                    if duration_file.exists():
-                        with open(duration_file, 'r') as f:
-                            duration_data = json.load(f)
-                            if duration_data.get('tool_name') == tool_name:
-                                duration_ms = duration_data.get('duration_ms')
-                        # Clean up duration file after reading
-                        duration_file.unlink()
-                except Exception:
-                    pass
+                duration_ms = collector.take_last_tool_duration(session_id, tool_name)
 
             # Collect Tier 1 metadata (tool performance + session stats)
             tier1_metadata = collector.collect_tier1_metadata(
@@ -243,10 +569,12 @@ def main():
                 tool_input if tool_input else None
             )
 
-            # Cleanup old sessions periodically (every 100 events)
-            import random
-            if random.randint(1, 100) == 1:
+            # Cleanup old sessions periodically (at most once an hour)
+            if cleanup_due():
                 collector.cleanup_old_sessions()
+
+            # State writes are deferred and this hook skips atexit
+            collector.flush()
         except Exception as e:
             print(f"Warning: Failed to collect metadata: {e}", file=sys.stderr)
 
@@ -256,7 +584,7 @@ def main():
         'session_id': session_id,
         'hook_event_type': args.event_type,
         'payload': input_data,
-        'timestamp': int(datetime.now().timestamp() * 1000),
+        'timestamp': time.time_ns() // 1_000_000,
         'model_name': model_name,
         # ✨ Multi-agent support
         'agent_type': args.agent_type,
@@ -274,39 +602,37 @@ def main():
     if tier2_metadata:
         event_data['workflow'] = tier2_metadata
     
-    # Handle --add-chat option
+    # Handle --add-chat option: the transcript is spliced into the event as
+    # already-encoded JSON rather than decoded and re-encoded
+    raw_fields = {}
     if args.add_chat and 'transcript_path' in input_data:
-        transcript_path = input_data['transcript_path']
-        if os.path.exists(transcript_path):
-            # Read .jsonl file and convert to JSON array
-            chat_data = []
-            try:
-                with open(transcript_path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                chat_data.append(json.loads(line))
-                            except json.JSONDecodeError:
-                                pass  # Skip invalid lines
-                
-                # Add chat to event data
-                event_data['chat'] = chat_data
-            except Exception as e:
-                print(f"Failed to read transcript: {e}", file=sys.stderr)
+        try:
+            raw_fields['chat'] = read_transcript_array(input_data['transcript_path'])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Failed to read transcript: {e}", file=sys.stderr)
     
     # Generate summary if requested
     if args.summarize:
+        from utils.summarizer import generate_event_summary
         summary = generate_event_summary(event_data)
         if summary:
             event_data['summary'] = summary
         # Continue even if summary generation fails
     
-    # Send to server
-    success = send_event_to_server(event_data, args.server_url)
-    
-    # Always exit with 0 to not block Claude Code operations
-    sys.exit(0)
+    # Hand the event to a detached worker that sends it and then drains the
+    # queue, so the hook never blocks on the network; send inline only if
+    # the worker cannot be started
+    body = dumps_with_raw(event_data, raw_fields)
+    if not spawn_flush_worker(args.server_url, body):
+        send_event_to_server(body, args.server_url)
+
+    # Always exit with 0 to not block Claude Code operations. Skip
+    # interpreter teardown; the flush worker is already detached.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(0)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+JSON encode/decode helpers for hooks.
+
+Uses orjson when it is installed (hook scripts declare it in their PEP 723
+dependencies) and falls back to the stdlib json module otherwise. Both paths
+produce compact UTF-8 bytes so callers can write the result straight to a
+binary file or HTTP body.
+"""
+
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact JSON bytes."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Deserialize JSON from bytes or str."""
+        return orjson.loads(data)
+
+except ImportError:
+    import json
+
+    ORJSON_AVAILABLE = False
+    JSONDecodeError = json.JSONDecodeError
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact JSON bytes."""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Deserialize JSON from bytes or str."""
+        return json.loads(data)
+
+
+def dumps_with_raw(obj: Dict[str, Any], raw_fields: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Serialize a dict and splice in values that are already encoded JSON.
+
+    Lets large payloads (e.g. a chat transcript read from disk) pass through
+    without a decode/re-encode round trip. The caller is responsible for the
+    raw values being valid single-line JSON.
+
+    Args:
+        obj: Dict to serialize
+        raw_fields: Mapping of key -> pre-encoded JSON value
+
+    Returns:
+        Compact JSON bytes for obj with raw_fields added
+    """
+    encoded = dumps(obj)
+    if not raw_fields:
+        return encoded
+
+    members = b','.join(dumps(key) + b':' + value for key, value in raw_fields.items())
+    separator = b',' if len(encoded) > 2 else b''
+    return encoded[:-1] + separator + members + b'}'
@@ -9,140 +9,562 @@ Tier 0: Essential Context
 """
 
 import os
+import re
+import fcntl
+import atexit
 import subprocess
 import platform
+import shutil
 import json
 import sys
 import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
+from json_codec import dumps, loads
+
+try:
+    from tool_metadata_parser import get_parser
+except ImportError:
+    get_parser = None
+
+# Language toolchains reported in the environment context:
+# (env key, commands to try in order, parser for the command's output)
+VERSION_PROBES = (
+    ('pythonVersion', (['python3', '--version'], ['python', '--version']), lambda out: out.replace('Python ', '')),
+    ('nodeVersion', (['node', '--version'],), lambda out: out.replace('v', '')),
+    ('goVersion', (['go', 'version'],), lambda out: out.split()[2].replace('go', '')),
+    ('rustVersion', (['rustc', '--version'],), lambda out: out.split()[1]),
+)
+
+# Short display names for model families, matched as substrings of the
+# lowercased model id in order
+MODEL_SHORT_NAMES = (
+    ('sonnet', 'Sonnet 4.5'),
+    ('opus', 'Opus 4.5'),
+    ('haiku', 'Haiku 4.5'),
+)
+
+# Session stats counter bumped for each tool
+TOOL_STAT_KEYS = {
+    'Read': 'filesRead',
+    'Write': 'filesWritten',
+    'Edit': 'filesEdited',
+    'Bash': 'bashCommandsRun',
+    'Grep': 'grepSearches',
+    'Glob': 'globSearches',
+    'Task': 'subagentsLaunched',
+    'WebSearch': 'webSearches',
+    'WebFetch': 'webFetches',
+}
+
+# Bash commands counted as test runs (pytest, jest, go test, npm test, ...)
+TEST_COMMAND_RE = re.compile(r'test|jest', re.IGNORECASE)
+
+# Seconds a single version probe may take before it is abandoned
+VERSION_PROBE_TIMEOUT_SECONDS = 2
+
+
+def format_skill_timestamp(epoch: float) -> str:
+    """Format an epoch as ISO 8601 UTC with milliseconds and a Z suffix."""
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(epoch)) + f'.{int(epoch * 1000) % 1000:03d}Z'
+
+
+def _binary_key(commands: tuple) -> List[list]:
+    """
+    Identify the binaries a version probe would run.
+
+    Returns:
+        [path, mtime_ns] per command, [None, 0] if it is not on PATH
+    """
+    key = []
+    for command in commands:
+        path = shutil.which(command[0])
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns if path else 0
+        except OSError:
+            mtime_ns = 0
+        key.append([path, mtime_ns])
+    return key
+
+
+def _probe_version(commands: tuple, binaries: List[list], parse) -> Optional[str]:
+    """
+    Run the first available version command and parse its output.
+
+    Args:
+        commands: Version commands to try in order
+        binaries: _binary_key(commands), giving each command's resolved path
+        parse: Parser for the command's output
+
+    Returns:
+        Version string, or None if no command is installed or parseable
+
+    Raises:
+        subprocess.TimeoutExpired: if a command hangs
+    """
+    for command, (path, _) in zip(commands, binaries):
+        if path is None:
+            continue
+        try:
+            # An absolute executable and close_fds=False let subprocess use
+            # posix_spawn instead of fork+exec (hook fds are non-inheritable)
+            output = subprocess.run(
+                [path] + command[1:],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                timeout=VERSION_PROBE_TIMEOUT_SECONDS,
+                check=True,
+                close_fds=False
+            ).stdout.strip()
+            return parse(output)
+        except (subprocess.CalledProcessError, FileNotFoundError, IndexError):
+            continue
+    return None
+
 
 class MetadataCollector:
     """Collect universal metadata about the Claude Code session."""
 
-    # Singleton state file for session tracking
-    STATE_FILE = Path.home() / '.claude-observability-state.json'
+    # Singleton state file for session tracking, in the user's home directory
+    STATE_FILE_NAME = '.claude-observability-state.json'
+
+    # Append-only log of state mutations not yet folded into the state file;
+    # replayed on load, compacted on cleanup
+    STATE_LOG_FILE_NAME = '.claude-observability-state.log'
+
+    # Log size past which flush() compacts it, so the log stays bounded
+    # even when nothing calls cleanup_old_sessions
+    STATE_LOG_MAX_BYTES = 256 * 1024
+
+    # flock target serializing compaction against log appends and loads
+    STATE_LOCK_FILE_NAME = '.claude-observability-state.lock'
+
+    # Files under .git whose mtimes change whenever the git context does
+    # (the checked-out branch ref is added at runtime)
+    GIT_STATE_FILES = ('HEAD', 'index', 'packed-refs', 'FETCH_HEAD')
+
+    # Pending tool starts kept per session for duration tracking
+    MAX_TOOL_STARTS = 10
+
+    # Max age of a cached git context. Working tree edits touch nothing under
+    # .git, so this bounds how long the dirty/unstaged counts can lag.
+    GIT_CACHE_TTL_SECONDS = 10
 
     def __init__(self, project_dir: str):
         self.project_dir = project_dir
+        self._project_name = os.path.basename(project_dir)
+
+        # Resolved per instance, not at import: the hook daemon imports this
+        # module before it knows the HOME of the hooks it will serve
+        home = Path.home()
+        self.state_file = home / self.STATE_FILE_NAME
+        self.state_log_file = home / self.STATE_LOG_FILE_NAME
+        self.state_lock_file = home / self.STATE_LOCK_FILE_NAME
+
+        # Environment fields that cannot change within a process
+        self._static_env = {
+            "os": platform.system().lower(),
+            "osVersion": platform.release(),
+            "shell": os.environ.get('SHELL', '').rpartition('/')[2],
+            "user": os.environ.get('USER', 'unknown'),
+        }
+
+        self._git_cache: Optional[Dict[str, Any]] = None
+        self._git_dir: Optional[str] = None
+        self._git_dir_found = False
+
+        # collect_tier0_metadata results by (session_id, model_name), dropped
+        # whenever the state changes
+        self._tier0_cache: Dict[tuple, Dict[str, Any]] = {}
+        self._parser = get_parser(project_dir) if get_parser is not None else None
+
+        # Mutations are buffered and appended to the state log by flush();
+        # the snapshot is only rewritten when cleanup_old_sessions compacts
+        self._pending_ops: List[Dict[str, Any]] = []
         self._state = self._load_state()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _state_lock(self, operation: int):
+        """
+        Hold an flock on the state lock file.
+
+        Log appends and state loads share the lock; compaction takes it
+        exclusively so nobody appends to or reads a log being folded away.
+        """
+        fd = os.open(self.state_lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            os.close(fd)
 
     def _load_state(self) -> Dict[str, Any]:
-        """Load persistent state from file."""
+        """Load persistent state under a shared lock."""
+        try:
+            with self._state_lock(fcntl.LOCK_SH):
+                return self._read_state()
+        except OSError as e:
+            print(f"Warning: Could not lock state: {e}", file=sys.stderr)
+            return self._read_state()
+
+    def _read_state(self) -> Dict[str, Any]:
+        """Read the state snapshot and replay the state log on top of it."""
+        self._state = {}
         try:
-            if self.STATE_FILE.exists():
-                with open(self.STATE_FILE, 'r') as f:
-                    return json.load(f)
+            with open(self.state_file, 'rb') as f:
+                self._state = loads(f.read())
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"Warning: Could not load state: {e}", file=sys.stderr)
-        return {}
+        self._replay_state_log()
+        return self._state
 
-    def _save_state(self):
-        """Save persistent state to file."""
+    def flush(self):
+        """
+        Append buffered mutations to the state log.
+
+        Runs at interpreter exit; hooks that leave with os._exit call it
+        explicitly. All records go out in a single O_APPEND write, so
+        concurrent hook processes never interleave or drop each other's
+        updates. Once the log outgrows STATE_LOG_MAX_BYTES it is compacted
+        by cleanup_old_sessions.
+        """
+        if not self._pending_ops:
+            return
+
+        log_size = 0
         try:
-            with open(self.STATE_FILE, 'w') as f:
-                json.dump(self._state, f)
-        except Exception as e:
+            with self._state_lock(fcntl.LOCK_SH):
+                fd = os.open(self.state_log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, b''.join(dumps(op) + b'\n' for op in self._pending_ops))
+                    log_size = os.fstat(fd).st_size
+                finally:
+                    os.close(fd)
+        except OSError as e:
             print(f"Warning: Could not save state: {e}", file=sys.stderr)
 
+        self._pending_ops.clear()
+
+        # send_event.py cleans up hourly, but hooks run through the Go
+        # claude-hook never do
+        if log_size > self.STATE_LOG_MAX_BYTES:
+            self.cleanup_old_sessions()
+
+    def _replay_state_log(self):
+        """Apply mutations from the state log on top of the loaded snapshot."""
+        try:
+            with open(self.state_log_file, 'rb') as f:
+                lines = f.read().split(b'\n')
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Warning: Could not read state log: {e}", file=sys.stderr)
+            return
+
+        for line in lines:
+            if not line:
+                continue
+            try:
+                self._apply_op(loads(line))
+            except Exception:
+                continue  # Skip a torn or unreadable record
+
+    def _log_op(self, op: Dict[str, Any]):
+        """
+        Apply a mutation to the in-memory state and queue it for the state log.
+
+        Queued records are appended in a single O_APPEND write by flush()
+        instead of rewriting the whole state file per mutation.
+        """
+        self._apply_op(op)
+        self._pending_ops.append(op)
+        self._tier0_cache.clear()
+
+    def _apply_op(self, op: Dict[str, Any]):
+        """Apply one state log record (see the _log_op callers)."""
+        kind = op['op']
+
+        if kind == 'env_cache':
+            self._state['envCache'] = op['cache']
+            return
+
+        session_key = self._get_session_key(op['session'])
+        session = self._state.get(session_key)
+
+        if kind == 'git_cache':
+            if session is not None:
+                session['gitCache'] = op['cache']
+            return
+
+        if kind == 'tool_count':
+            if session is not None:
+                session['toolCount'] = session.get('toolCount', 0) + 1
+            return
+
+        if kind == 'take_duration':
+            if session is not None:
+                session.pop('lastToolDuration', None)
+            return
+
+        if session is None:
+            session = self._state[session_key] = self._new_session(op['t'])
+
+        if kind == 'todos':
+            session['todos'] = op['todos']
+            session['lastToolTimestamp'] = datetime.fromtimestamp(op['t'], timezone.utc).isoformat().replace('+00:00', 'Z')
+
+        elif kind == 'skill':
+            # Only the count and latest skill are kept, so reading skill
+            # usage never depends on the length of the session
+            session['skillCount'] = session.get('skillCount', 0) + 1
+            session['lastSkill'] = {
+                'skillName': op['skill'],
+                'timestamp': format_skill_timestamp(op['t'])
+            }
+
+        elif kind == 'tool_start':
+            tool_starts = self._get_tool_starts(session)
+            tool_starts.append([op['t'], op['tool'], op['input']])
+
+            # Keep only last MAX_TOOL_STARTS tool starts to prevent memory growth
+            if len(tool_starts) > self.MAX_TOOL_STARTS:
+                del tool_starts[0]
+
+        elif kind == 'tool_end':
+            tool_starts = self._get_tool_starts(session)
+            for i, (start_time, tool_name, tool_input) in enumerate(tool_starts):
+                if start_time == op['start'] and tool_name == op['tool']:
+                    del tool_starts[i]
+                    break
+            else:
+                return
+
+            self._update_session_stats(session, op['tool'], op['durationMs'], tool_input)
+
+            # Hand the duration to this event's send_event.py via the state
+            session['lastToolDuration'] = {
+                'toolName': op['tool'],
+                'durationMs': op['durationMs']
+            }
+
+    def _get_tool_starts(self, session: Dict[str, Any]) -> List[list]:
+        """
+        Return the session's pending tool starts, oldest first.
+
+        Each entry is [start_time, tool_name, tool_input]. State written by
+        older versions keyed starts by a "tool_start_<time>_<tool>" string;
+        those are converted in place.
+        """
+        tool_starts = session.get('toolStarts')
+        if isinstance(tool_starts, list):
+            return tool_starts
+
+        legacy = sorted((tool_starts or {}).values(), key=lambda v: v['startTime'])
+        tool_starts = [[v['startTime'], v['toolName'], v.get('toolInput', {})] for v in legacy]
+        session['toolStarts'] = tool_starts
+        return tool_starts
+
     def _get_session_key(self, session_id: str) -> str:
         """Get unique key for this session."""
         return f"session_{session_id}"
 
-    def get_git_context(self) -> Dict[str, Any]:
+    def _new_session(self, start_epoch: float) -> Dict[str, Any]:
         """
-        Extract git repository context.
+        Create the state entry for a session starting at start_epoch.
+
+        The start is stored both as ISO 8601 (reported in events) and as an
+        epoch float, so durations need no datetime parsing.
+        """
+        start_time = datetime.fromtimestamp(start_epoch, timezone.utc)
+        return {
+            'startTime': start_time.isoformat().replace('+00:00', 'Z'),
+            'startTimeEpoch': start_epoch,
+            'toolCount': 0
+        }
+
+    def _get_start_epoch(self, session_data: Dict[str, Any]) -> float:
+        """Return a session's start as an epoch float."""
+        start_epoch = session_data.get('startTimeEpoch')
+        if start_epoch is not None:
+            return start_epoch
+
+        # Sessions created by claude-hook only carry the ISO start time
+        start_time = datetime.fromisoformat(session_data['startTime'].replace('Z', '+00:00'))
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        return start_time.timestamp()
+
+    def _find_git_dir(self) -> Optional[str]:
+        """
+        Locate the git directory for project_dir without running git.
+
+        Walks up to the filesystem root looking for `.git`, which is a
+        directory in a normal checkout and a `gitdir: <path>` file in
+        worktrees and submodules. The result is cached on the instance.
 
         Returns:
-            Dict with git metadata or error information.
+            Path of the git directory, or None outside a repository
         """
+        if self._git_dir_found:
+            return self._git_dir
+
+        path = os.path.abspath(self.project_dir)
+        while True:
+            dot_git = os.path.join(path, '.git')
+            if os.path.isdir(dot_git):
+                self._git_dir = dot_git
+                break
+            if os.path.isfile(dot_git):
+                try:
+                    with open(dot_git) as f:
+                        content = f.read().strip()
+                except OSError:
+                    content = ''
+                if content.startswith('gitdir: '):
+                    self._git_dir = os.path.join(path, content[8:])
+                    break
+
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+
+        self._git_dir_found = True
+        return self._git_dir
+
+    def _git_state_key(self, git_dir: str) -> List[int]:
+        """Return the mtimes of the git metadata files that key the git cache."""
+        names = list(self.GIT_STATE_FILES)
         try:
-            # Check if we're in a git repository
-            subprocess.run(
-                ['git', 'rev-parse', '--git-dir'],
-                cwd=self.project_dir,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True
-            )
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            with open(os.path.join(git_dir, 'HEAD')) as f:
+                head = f.read().strip()
+            if head.startswith('ref: '):
+                names.append(head[5:])
+        except OSError:
+            pass
+
+        key = []
+        for name in names:
+            try:
+                key.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+            except OSError:
+                key.append(0)
+        return key
+
+    def get_git_context(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract git repository context, reusing a cached result while the
+        repository's HEAD, index and refs are unchanged.
+
+        The cache lives on the instance and, when session_id is given, in the
+        session's state so later hook invocations can reuse it too.
+
+        Args:
+            session_id: Optional session whose state holds the cached context
+
+        Returns:
+            Dict with git metadata or error information.
+        """
+        git_dir = self._find_git_dir()
+        if git_dir is None:
             return {"isGitRepo": False}
 
-        git_info = {"isGitRepo": True}
+        session_data = self._state.get(self._get_session_key(session_id)) if session_id else None
+        key = self._git_state_key(git_dir)
+        now = time.time()
 
-        try:
-            # Current branch
-            branch = subprocess.check_output(
-                ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-                cwd=self.project_dir,
-                stderr=subprocess.DEVNULL,
-                text=True
-            ).strip()
-            git_info['branch'] = branch
-        except Exception:
-            git_info['branch'] = None
+        cached = self._git_cache or (session_data or {}).get('gitCache')
+        if cached and cached['key'] == key and now - cached['time'] < self.GIT_CACHE_TTL_SECONDS:
+            return dict(cached['git'])
 
-        try:
-            # Current commit hash (short)
-            commit_hash = subprocess.check_output(
-                ['git', 'rev-parse', '--short', 'HEAD'],
-                cwd=self.project_dir,
-                stderr=subprocess.DEVNULL,
-                text=True
-            ).strip()
-            git_info['commitHash'] = commit_hash
-        except Exception:
-            git_info['commitHash'] = None
+        git_info = self._read_git_context()
+        self._git_cache = {'key': key, 'time': now, 'git': git_info}
+
+        # Log the context only when it changed: a record per expired TTL
+        # would grow the state log, and force compactions, far faster
+        # than the tool records do
+        if session_data is not None:
+            logged = session_data.get('gitCache')
+            if not logged or logged['key'] != key or logged['git'] != git_info:
+                self._log_op({'op': 'git_cache', 'session': session_id, 'cache': self._git_cache})
+
+        return dict(git_info)
+
+    def _read_git_context(self) -> Dict[str, Any]:
+        """
+        Read git repository context from git.
+
+        Everything comes from a single `git status --porcelain=v2 --branch`
+        call: the `# branch.*` header lines carry branch, commit, upstream
+        and ahead/behind counts, and the entry lines the dirty state.
+
+        Returns:
+            Dict with git metadata or error information.
+        """
+        git = shutil.which('git')
+        if git is None:
+            return {"isGitRepo": False}
 
         try:
-            # Check for uncommitted changes
-            status = subprocess.check_output(
-                ['git', 'status', '--porcelain'],
-                cwd=self.project_dir,
+            # `-C` instead of cwd=, an absolute executable and close_fds=False
+            # let subprocess use posix_spawn instead of fork+exec
+            result = subprocess.run(
+                [git, '-C', self.project_dir, '--no-optional-locks', 'status', '--porcelain=v2', '--branch'],
+                stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
-                text=True
+                text=True,
+                close_fds=False
             )
-            git_info['isDirty'] = len(status.strip()) > 0
+        except (OSError, subprocess.SubprocessError):
+            return {"isGitRepo": False}
 
-            # Count staged and unstaged files
-            staged = len([line for line in status.split('\n') if line.startswith(('M ', 'A ', 'D '))])
-            unstaged = len([line for line in status.split('\n') if line.startswith(' M')])
-            git_info['stagedFiles'] = staged
-            git_info['unstagedFiles'] = unstaged
-        except Exception:
-            git_info['isDirty'] = None
+        if result.returncode != 0:
+            return {"isGitRepo": False}
 
-        try:
-            # Remote tracking branch
-            remote_branch = subprocess.check_output(
-                ['git', 'rev-parse', '--abbrev-ref', '@{upstream}'],
-                cwd=self.project_dir,
-                stderr=subprocess.DEVNULL,
-                text=True
-            ).strip()
-            git_info['remoteBranch'] = remote_branch
-        except Exception:
-            git_info['remoteBranch'] = None
+        git_info = {
+            "isGitRepo": True,
+            "branch": None,
+            "commitHash": None,
+            "isDirty": False,
+            "stagedFiles": 0,
+            "unstagedFiles": 0,
+            "remoteBranch": None,
+            "commitsAhead": 0,
+            "commitsBehind": 0,
+        }
 
-        try:
-            # Commits ahead/behind remote
-            if git_info.get('remoteBranch'):
-                ahead_behind = subprocess.check_output(
-                    ['git', 'rev-list', '--left-right', '--count', 'HEAD...@{upstream}'],
-                    cwd=self.project_dir,
-                    stderr=subprocess.DEVNULL,
-                    text=True
-                ).strip().split()
-                git_info['commitsAhead'] = int(ahead_behind[0])
-                git_info['commitsBehind'] = int(ahead_behind[1])
-            else:
-                git_info['commitsAhead'] = 0
-                git_info['commitsBehind'] = 0
-        except Exception:
-            git_info['commitsAhead'] = 0
-            git_info['commitsBehind'] = 0
+        for line in result.stdout.splitlines():
+            if line.startswith('# '):
+                key, _, value = line[2:].partition(' ')
+                if key == 'branch.head':
+                    # Detached HEAD reports like `git rev-parse --abbrev-ref HEAD`
+                    git_info['branch'] = 'HEAD' if value == '(detached)' else value
+                elif key == 'branch.oid':
+                    git_info['commitHash'] = None if value == '(initial)' else value[:7]
+                elif key == 'branch.upstream':
+                    git_info['remoteBranch'] = value
+                elif key == 'branch.ab':
+                    ahead, behind = value.split()
+                    git_info['commitsAhead'] = int(ahead)
+                    git_info['commitsBehind'] = -int(behind)
+                continue
+
+            git_info['isDirty'] = True
+
+            # Ordinary changed entries: "1 XY ...", with '.' for unmodified
+            if line.startswith('1 '):
+                xy = line[2:4]
+                if xy in ('M.', 'A.', 'D.'):
+                    git_info['stagedFiles'] += 1
+                elif xy == '.M':
+                    git_info['unstagedFiles'] += 1
 
         return git_info
 
@@ -163,32 +585,18 @@ class MetadataCollector:
         session_key = self._get_session_key(session_id)
 
         # Initialize session if first time seeing it
-        if session_key not in self._state:
-            self._state[session_key] = {
-                'startTime': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-                'toolCount': 0
-            }
-            self._save_state()
-
-        session_data = self._state[session_key]
-        start_time = datetime.fromisoformat(session_data['startTime'].replace('Z', '+00:00'))
-        # Ensure both datetimes are timezone-aware for subtraction
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=timezone.utc)
-        duration = (datetime.now(timezone.utc) - start_time).total_seconds() / 60
+        session_data = self._state.get(session_key)
+        if session_data is None:
+            self._log_op({'op': 'session_start', 'session': session_id, 't': time.time()})
+            session_data = self._state[session_key]
+        duration = (time.time() - self._get_start_epoch(session_data)) / 60
 
         # Use provided model_name or fall back to environment variable
         model = model_name or os.environ.get('CLAUDE_MODEL', 'unknown')
 
         # Extract just the model name for readability
-        if 'sonnet' in model.lower():
-            model_short = 'Sonnet 4.5'
-        elif 'opus' in model.lower():
-            model_short = 'Opus 4.5'
-        elif 'haiku' in model.lower():
-            model_short = 'Haiku 4.5'
-        else:
-            model_short = model
+        model_lower = model.lower()
+        model_short = next((short for family, short in MODEL_SHORT_NAMES if family in model_lower), model)
 
         return {
             "startTime": session_data['startTime'],
@@ -196,17 +604,15 @@ class MetadataCollector:
             "model": model,
             "modelShort": model_short,
             "workingDirectory": self.project_dir,
-            "workingDirectoryName": os.path.basename(self.project_dir),
+            "workingDirectoryName": self._project_name,
             "sessionId": session_id,
             "toolCount": session_data.get('toolCount', 0)
         }
 
     def increment_tool_count(self, session_id: str):
         """Increment tool count for this session."""
-        session_key = self._get_session_key(session_id)
-        if session_key in self._state:
-            self._state[session_key]['toolCount'] = self._state[session_key].get('toolCount', 0) + 1
-            self._save_state()
+        if self._get_session_key(session_id) in self._state:
+            self._log_op({'op': 'tool_count', 'session': session_id})
 
     def get_environment_context(self) -> Dict[str, Any]:
         """
@@ -215,58 +621,45 @@ class MetadataCollector:
         Returns:
             Dict with environment metadata
         """
-        env = {
-            "os": platform.system().lower(),
-            "osVersion": platform.release(),
-            "shell": os.environ.get('SHELL', '').split('/')[-1],
-            "user": os.environ.get('USER', 'unknown'),
-        }
+        env = dict(self._static_env)
+
+        # Toolchain versions rarely change: reuse each probed version until
+        # the path or mtime of its binaries changes
+        cached = self._state.get('envCache')
+        probes = dict(cached['probes']) if isinstance(cached, dict) and isinstance(cached.get('probes'), dict) else {}
+
+        stale = []
+        for key, commands, parse in VERSION_PROBES:
+            binaries = _binary_key(commands)
+            entry = probes.get(key)
+            if isinstance(entry, dict) and entry.get('binaries') == binaries:
+                if entry.get('version'):
+                    env[key] = entry['version']
+            elif any(path for path, _ in binaries):
+                stale.append((key, commands, parse, binaries))
+            else:
+                # Not installed: nothing to run
+                probes[key] = {'binaries': binaries, 'version': None}
 
-        # Detect Python version (try multiple commands)
-        for python_cmd in ['python3', 'python']:
-            try:
-                python_version = subprocess.check_output(
-                    [python_cmd, '--version'],
-                    stderr=subprocess.STDOUT,
-                    text=True
-                ).strip().replace('Python ', '')
-                env['pythonVersion'] = python_version
-                break
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                continue
+        if stale:
+            # Probes are independent, so run them concurrently
+            from concurrent.futures import ThreadPoolExecutor
 
-        # Detect Node version
-        try:
-            node_version = subprocess.check_output(
-                ['node', '--version'],
-                stderr=subprocess.STDOUT,
-                text=True
-            ).strip().replace('v', '')
-            env['nodeVersion'] = node_version
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
+            with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+                futures = [(key, binaries, pool.submit(_probe_version, commands, binaries, parse))
+                           for key, commands, parse, binaries in stale]
 
-        # Detect Go version
-        try:
-            go_version = subprocess.check_output(
-                ['go', 'version'],
-                stderr=subprocess.STDOUT,
-                text=True
-            ).strip().split()[2].replace('go', '')
-            env['goVersion'] = go_version
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
+            for key, binaries, future in futures:
+                try:
+                    version = future.result()
+                except subprocess.TimeoutExpired:
+                    continue  # Don't cache a probe that only timed out
+                probes[key] = {'binaries': binaries, 'version': version}
+                if version:
+                    env[key] = version
 
-        # Detect Rust version
-        try:
-            rust_version = subprocess.check_output(
-                ['rustc', '--version'],
-                stderr=subprocess.STDOUT,
-                text=True
-            ).strip().split()[1]
-            env['rustVersion'] = rust_version
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
+        if probes != (cached or {}).get('probes'):
+            self._log_op({'op': 'env_cache', 'cache': {'probes': probes}})
 
         return env
 
@@ -279,27 +672,16 @@ class MetadataCollector:
             tool_name: Name of the tool being used
             tool_input: Tool input parameters
         """
-        session_key = self._get_session_key(session_id)
-        if session_key not in self._state:
-            self._state[session_key] = {'startTime': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'), 'toolCount': 0}
-
-        # Store tool start time with unique ID (timestamp + tool name)
-        tool_start_key = f"tool_start_{time.time()}_{tool_name}"
-        if 'toolStarts' not in self._state[session_key]:
-            self._state[session_key]['toolStarts'] = {}
-
-        self._state[session_key]['toolStarts'][tool_start_key] = {
-            'toolName': tool_name,
-            'startTime': time.time(),
-            'toolInput': tool_input
-        }
-
-        # Keep only last 10 tool starts to prevent memory growth
-        if len(self._state[session_key]['toolStarts']) > 10:
-            oldest_key = min(self._state[session_key]['toolStarts'].keys())
-            del self._state[session_key]['toolStarts'][oldest_key]
-
-        self._save_state()
+        # Only the command is kept: it is all _update_session_stats looks at,
+        # and full inputs (e.g. Write contents) would bloat the state log
+        command = tool_input.get('command') if isinstance(tool_input, dict) else None
+        self._log_op({
+            'op': 'tool_start',
+            'session': session_id,
+            'tool': tool_name,
+            't': time.time(),
+            'input': {'command': command} if isinstance(command, str) else {}
+        })
 
     def record_tool_end(self, session_id: str, tool_name: str) -> Optional[float]:
         """
@@ -312,29 +694,52 @@ class MetadataCollector:
         Returns:
             Duration in milliseconds, or None if no matching start found
         """
-        session_key = self._get_session_key(session_id)
-        if session_key not in self._state or 'toolStarts' not in self._state[session_key]:
+        session_data = self._state.get(self._get_session_key(session_id))
+        if session_data is None:
             return None
 
-        # Find most recent start for this tool
-        tool_starts = self._state[session_key]['toolStarts']
-        matching_starts = [(k, v) for k, v in tool_starts.items() if v['toolName'] == tool_name]
-
-        if not matching_starts:
+        # Find most recent start for this tool (starts are in append order)
+        for start_time, start_tool, _ in reversed(self._get_tool_starts(session_data)):
+            if start_tool == tool_name:
+                break
+        else:
             return None
 
-        # Get most recent start
-        start_key, start_data = max(matching_starts, key=lambda x: x[1]['startTime'])
-        duration_ms = (time.time() - start_data['startTime']) * 1000
+        duration_ms = round((time.time() - start_time) * 1000, 2)
+
+        # Updates session stats, removes the start entry and records the
+        # duration for send_event.py
+        self._log_op({
+            'op': 'tool_end',
+            'session': session_id,
+            'tool': tool_name,
+            'start': start_time,
+            'durationMs': duration_ms
+        })
+
+        # Flush right away: send_event.py reads the duration from the state
+        self.flush()
+
+        return duration_ms
 
-        # Update session stats
-        self._update_session_stats(session_key, tool_name, duration_ms, start_data.get('toolInput', {}))
+    def take_last_tool_duration(self, session_id: str, tool_name: str) -> Optional[float]:
+        """
+        Consume the duration recorded by the last record_tool_end (Tier 1).
 
-        # Remove the start entry
-        del self._state[session_key]['toolStarts'][start_key]
-        self._save_state()
+        Args:
+            session_id: Unique session identifier
+            tool_name: Name of the tool the caller is reporting on
 
-        return round(duration_ms, 2)
+        Returns:
+            Duration in milliseconds if the last recorded tool matches, else None
+        """
+        session_key = self._get_session_key(session_id)
+        last = self._state.get(session_key, {}).get('lastToolDuration')
+        if last is None:
+            return None
+
+        self._log_op({'op': 'take_duration', 'session': session_id})
+        return last['durationMs'] if last.get('toolName') == tool_name else None
 
     def record_todos(self, session_id: str, todos: List[Dict[str, Any]]):
         """
@@ -344,22 +749,23 @@ class MetadataCollector:
             session_id: Unique session identifier
             todos: List of todo items with content, status, and activeForm
         """
-        session_key = self._get_session_key(session_id)
-        if session_key not in self._state:
-            self._state[session_key] = {
-                'startTime': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-                'toolCount': 0
-            }
+        self._log_op({'op': 'todos', 'session': session_id, 't': time.time(), 'todos': todos})
+
+    def record_skill(self, session_id: str, skill_name: str):
+        """
+        Record a Skill invocation for session tracking (Tier 2).
 
-        # Store todos with timestamp
-        self._state[session_key]['todos'] = todos
-        self._state[session_key]['lastToolTimestamp'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        self._save_state()
+        Args:
+            session_id: Unique session identifier
+            skill_name: Name of the invoked skill
+        """
+        self._log_op({'op': 'skill', 'session': session_id, 't': time.time(), 'skill': skill_name})
 
-    def _update_session_stats(self, session_key: str, tool_name: str, duration_ms: float, tool_input: Dict[str, Any]):
+    def _update_session_stats(self, session: Dict[str, Any], tool_name: str, duration_ms: float, tool_input: Dict[str, Any]):
         """Update cumulative session statistics."""
-        if 'stats' not in self._state[session_key]:
-            self._state[session_key]['stats'] = {
+        stats = session.get('stats')
+        if stats is None:
+            stats = session['stats'] = {
                 'toolsExecuted': 0,
                 'filesRead': 0,
                 'filesWritten': 0,
@@ -375,33 +781,17 @@ class MetadataCollector:
                 'webFetches': 0
             }
 
-        stats = self._state[session_key]['stats']
         stats['toolsExecuted'] += 1
         stats['totalToolTimeMs'] += duration_ms
 
         # Update tool-specific counters
-        if tool_name == 'Read':
-            stats['filesRead'] += 1
-        elif tool_name == 'Write':
-            stats['filesWritten'] += 1
-        elif tool_name == 'Edit':
-            stats['filesEdited'] += 1
-        elif tool_name == 'Bash':
-            stats['bashCommandsRun'] += 1
-            # Detect test commands
-            command = tool_input.get('command', '').lower()
-            if any(test_cmd in command for test_cmd in ['pytest', 'jest', 'test', 'go test']):
-                stats['testsRun'] += 1
-        elif tool_name == 'Grep':
-            stats['grepSearches'] += 1
-        elif tool_name == 'Glob':
-            stats['globSearches'] += 1
-        elif tool_name == 'Task':
-            stats['subagentsLaunched'] += 1
-        elif tool_name == 'WebSearch':
-            stats['webSearches'] += 1
-        elif tool_name == 'WebFetch':
-            stats['webFetches'] += 1
+        stat_key = TOOL_STAT_KEYS.get(tool_name)
+        if stat_key:
+            stats[stat_key] += 1
+
+        # Detect test commands
+        if tool_name == 'Bash' and TEST_COMMAND_RE.search(tool_input.get('command', '')):
+            stats['testsRun'] += 1
 
     def get_tool_metadata(self, session_id: str, tool_name: str, tool_input: Dict[str, Any], duration_ms: Optional[float] = None) -> Dict[str, Any]:
         """
@@ -423,14 +813,13 @@ class MetadataCollector:
         }
 
         # Parse tool-specific metadata
-        try:
-            from tool_metadata_parser import ToolMetadataParser
-            parser = ToolMetadataParser(self.project_dir)
-            tool_specific = parser.parse_tool(tool_name, tool_input)
-            metadata["metadata"] = tool_specific
-        except ImportError:
+        if self._parser is None:
             # Graceful fallback if parser not available
             metadata["metadata"] = {}
+            return metadata
+
+        try:
+            metadata["metadata"] = self._parser.parse_tool(tool_name, tool_input)
         except Exception as e:
             metadata["metadata"] = {"parseError": str(e)}
 
@@ -446,8 +835,9 @@ class MetadataCollector:
         Returns:
             Dict with session statistics
         """
-        session_key = self._get_session_key(session_id)
-        if session_key not in self._state or 'stats' not in self._state[session_key]:
+        session_data = self._state.get(self._get_session_key(session_id))
+        stats = session_data.get('stats') if session_data is not None else None
+        if stats is None:
             return {
                 'toolsExecuted': 0,
                 'filesRead': 0,
@@ -460,7 +850,7 @@ class MetadataCollector:
                 'errorCount': 0
             }
 
-        stats = self._state[session_key]['stats'].copy()
+        stats = stats.copy()
 
         # Calculate average tool time
         if stats['toolsExecuted'] > 0:
@@ -481,11 +871,18 @@ class MetadataCollector:
         Returns:
             Dict with all Tier 0 metadata fields
         """
-        return {
-            "git": self.get_git_context(),
+        cache_key = (session_id, model_name)
+        cached = self._tier0_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        metadata = {
+            "git": self.get_git_context(session_id),
             "session": self.get_session_context(session_id, model_name),
             "environment": self.get_environment_context()
         }
+        self._tier0_cache[cache_key] = metadata
+        return metadata
 
     def collect_tier1_metadata(self, session_id: str, tool_name: str = None, tool_input: Dict[str, Any] = None, duration_ms: Optional[float] = None) -> Dict[str, Any]:
         """
@@ -524,7 +921,7 @@ class MetadataCollector:
         """
         try:
             # Import Tier 2 collector
-            from workflow_intelligence import WorkflowIntelligence
+            from workflow_intelligence import get_workflow_intelligence
 
             # Get recent tool history for pattern detection
             session_key = self._get_session_key(session_id)
@@ -532,8 +929,9 @@ class MetadataCollector:
             recent_tools = session_data.get('toolHistory', [])[-20:]  # Last 20 tools
 
             # Collect Tier 2 metadata
-            tier2_collector = WorkflowIntelligence(self.project_dir)
-            return tier2_collector.collect_tier2_metadata(
+            workflow = get_workflow_intelligence(self.project_dir)
+            workflow.state = self._state
+            return workflow.collect_tier2_metadata(
                 session_id,
                 tool_name or 'Unknown',
                 tool_input or {},
@@ -544,25 +942,61 @@ class MetadataCollector:
             return {}
 
     def cleanup_old_sessions(self, max_age_hours: int = 24):
-        """Remove sessions older than max_age_hours from state."""
+        """
+        Remove sessions older than max_age_hours from state.
+
+        Also compacts the state log: under an exclusive lock the state is
+        reloaded from disk (picking up other processes' appends), written
+        to a new snapshot that replaces the state file atomically, and the log
+        is truncated.
+        """
+        self.flush()
         try:
-            now = datetime.now(timezone.utc)
-            to_delete = []
+            with self._state_lock(fcntl.LOCK_EX):
+                self._read_state()
+
+                # Every session is checked: the Go claude-hook rewrites the
+                # snapshot with its keys sorted, so state order says nothing
+                # about session age
+                cutoff = time.time() - max_age_hours * 3600
+                to_delete = [
+                    key for key, value in self._state.items()
+                    if key.startswith('session_') and self._get_start_epoch(value) < cutoff
+                ]
+
+                for key in to_delete:
+                    del self._state[key]
+
+                tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    os.write(fd, dumps(self._state))
+                finally:
+                    os.close(fd)
+                os.replace(tmp_path, self.state_file)
+
+                try:
+                    os.truncate(self.state_log_file, 0)
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            print(f"Warning: Could not cleanup old sessions: {e}", file=sys.stderr)
 
-            for key, value in self._state.items():
-                if key.startswith('session_'):
-                    start_time = datetime.fromisoformat(value['startTime'].replace('Z', '+00:00'))
-                    age_hours = (now - start_time.replace(tzinfo=None)).total_seconds() / 3600
-                    if age_hours > max_age_hours:
-                        to_delete.append(key)
 
-            for key in to_delete:
-                del self._state[key]
+_COLLECTOR: Optional[MetadataCollector] = None
 
-            if to_delete:
-                self._save_state()
-        except Exception as e:
-            print(f"Warning: Could not cleanup old sessions: {e}", file=sys.stderr)
+
+def get_collector(project_dir: str) -> MetadataCollector:
+    """
+    Return the process-wide MetadataCollector for project_dir.
+
+    Reuses the existing instance (and its loaded state) unless the project
+    directory changed, so callers in one process never load state twice.
+    """
+    global _COLLECTOR
+    if _COLLECTOR is None or _COLLECTOR.project_dir != project_dir:
+        _COLLECTOR = MetadataCollector(project_dir)
+    return _COLLECTOR
 
 
 # Standalone test
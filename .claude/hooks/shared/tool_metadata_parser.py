@@ -9,44 +9,120 @@ Extracts relevant metadata from Claude Code tool inputs:
 - Agent types (Task)
 """
 
-import os
 import re
+import functools
 from typing import Dict, Any, Optional
-from pathlib import Path
+
+
+# First whitespace-delimited word of a command line
+_FIRST_WORD_RE = re.compile(r'\s*(\S*)')
+
+# Command type for known command names, in priority order: a name listed
+# under several types gets the first one
+_COMMAND_TYPES = (
+    ('test', ('pytest', 'jest', 'npm test', 'go test', 'cargo test')),
+    ('build', ('npm', 'pnpm', 'yarn', 'make', 'cargo', 'go build', 'mvn', 'gradle')),
+    ('git', ('git',)),
+    ('lint', ('eslint', 'ruff', 'mypy', 'pylint', 'clippy')),
+    ('package', ('pip', 'uv', 'npm install', 'pnpm install', 'cargo install')),
+    ('read', ('ls', 'cat', 'head', 'tail', 'find', 'grep')),
+    ('filesystem', ('mkdir', 'touch', 'rm', 'mv', 'cp')),
+)
+
+# Substrings that classify otherwise unknown command names
+_COMMAND_TYPE_KEYWORDS = (
+    ('test', 'test'),
+    ('build', 'build'),
+    ('lint', 'lint'),
+    ('install', 'package'),
+)
+
+# Single lookup table for exact command names
+_EXACT_COMMAND_TYPE = {
+    name: command_type
+    for command_type, names in reversed(_COMMAND_TYPES)
+    for name in names
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_path_cached(project_prefix: str, file_path: str) -> Dict[str, str]:
+    """
+    Normalize a file path to relative and absolute forms.
+
+    Cached because the same files come up again and again within a
+    session. Callers must copy the result before modifying it. Uses plain
+    string operations on '/'-separated paths instead of os.path calls
+    that each rescan the path.
+
+    Args:
+        project_prefix: Project directory with a single trailing '/'
+        file_path: Absolute or project-relative file path
+
+    Returns:
+        Dict with absolute, relative, extension, and basename
+    """
+    try:
+        abs_path = file_path if file_path.startswith('/') else project_prefix + file_path
+        rel_path = abs_path[len(project_prefix):] if abs_path.startswith(project_prefix) else file_path
+
+        basename = file_path.rpartition('/')[2]
+
+        # Like os.path.splitext: leading dots (".bashrc") are not an extension
+        stem = basename.lstrip('.')
+        dot = stem.rfind('.')
+        extension = stem[dot:] if dot != -1 else ''
+
+        # Like os.path.dirname: drop trailing separators unless that is all
+        head, sep, _ = rel_path.rpartition('/')
+        directory = head.rstrip('/') or head or sep
+
+        return {
+            "filePath": abs_path,
+            "filePathRelative": rel_path,
+            "fileExtension": extension,
+            "fileBasename": basename,
+            "fileDirectory": directory
+        }
+    except Exception:
+        return {
+            "filePath": file_path,
+            "filePathRelative": file_path,
+            "fileExtension": "",
+            "fileBasename": "",
+            "fileDirectory": ""
+        }
 
 
 class ToolMetadataParser:
     """Parse tool inputs to extract relevant metadata for tracking."""
 
+    # Parser method for each tool, looked up by name per call
+    _PARSER_METHODS = {
+        'Read': 'parse_read_tool',
+        'Edit': 'parse_edit_tool',
+        'Write': 'parse_write_tool',
+        'Bash': 'parse_bash_tool',
+        'Grep': 'parse_grep_tool',
+        'Glob': 'parse_glob_tool',
+        'Task': 'parse_task_tool',
+        'WebSearch': 'parse_websearch_tool',
+        'WebFetch': 'parse_webfetch_tool',
+    }
+
     def __init__(self, project_dir: str):
         self.project_dir = project_dir
+        self._project_prefix = project_dir.rstrip('/') + '/'
 
     def _normalize_path(self, file_path: str) -> Dict[str, str]:
         """
         Normalize a file path to relative and absolute forms.
 
         Returns:
-            Dict with absolute, relative, extension, and basename
+            Dict with absolute, relative, extension, and basename (a fresh
+            copy the caller may add fields to)
         """
-        try:
-            abs_path = file_path if os.path.isabs(file_path) else os.path.join(self.project_dir, file_path)
-            rel_path = os.path.relpath(abs_path, self.project_dir) if abs_path.startswith(self.project_dir) else file_path
-
-            return {
-                "filePath": abs_path,
-                "filePathRelative": rel_path,
-                "fileExtension": os.path.splitext(file_path)[1],
-                "fileBasename": os.path.basename(file_path),
-                "fileDirectory": os.path.dirname(rel_path)
-            }
-        except Exception:
-            return {
-                "filePath": file_path,
-                "filePathRelative": file_path,
-                "fileExtension": "",
-                "fileBasename": "",
-                "fileDirectory": ""
-            }
+        return dict(_normalize_path_cached(self._project_prefix, file_path))
 
     def parse_read_tool(self, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """Extract metadata from Read tool."""
@@ -91,9 +167,8 @@ class ToolMetadataParser:
         """Extract metadata from Bash tool."""
         command = tool_input.get('command', '')
 
-        # Extract command name (first word)
-        command_parts = command.strip().split()
-        command_name = command_parts[0] if command_parts else ''
+        # Extract command name (first word) without splitting the whole command
+        command_name = _FIRST_WORD_RE.match(command).group(1)
 
         # Detect command type
         command_type = self._detect_command_type(command_name)
@@ -109,70 +184,61 @@ class ToolMetadataParser:
 
     def _detect_command_type(self, command_name: str) -> str:
         """Categorize command by type."""
-        test_commands = {'pytest', 'jest', 'npm test', 'go test', 'cargo test'}
-        build_commands = {'npm', 'pnpm', 'yarn', 'make', 'cargo', 'go build', 'mvn', 'gradle'}
-        git_commands = {'git'}
-        lint_commands = {'eslint', 'ruff', 'mypy', 'pylint', 'clippy'}
-        package_commands = {'pip', 'uv', 'npm install', 'pnpm install', 'cargo install'}
-
-        if command_name in test_commands or 'test' in command_name:
-            return 'test'
-        elif command_name in build_commands or 'build' in command_name:
-            return 'build'
-        elif command_name in git_commands:
-            return 'git'
-        elif command_name in lint_commands or 'lint' in command_name:
-            return 'lint'
-        elif command_name in package_commands or 'install' in command_name:
-            return 'package'
-        elif command_name in {'ls', 'cat', 'head', 'tail', 'find', 'grep'}:
-            return 'read'
-        elif command_name in {'mkdir', 'touch', 'rm', 'mv', 'cp'}:
-            return 'filesystem'
-        else:
-            return 'other'
+        command_type = _EXACT_COMMAND_TYPE.get(command_name)
+        if command_type:
+            return command_type
+
+        for keyword, keyword_type in _COMMAND_TYPE_KEYWORDS:
+            if keyword in command_name:
+                return keyword_type
+        return 'other'
 
     def parse_grep_tool(self, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """Extract metadata from Grep tool."""
+        get = tool_input.get
         return {
-            "pattern": tool_input.get('pattern', ''),
-            "path": tool_input.get('path', ''),
-            "glob": tool_input.get('glob', ''),
-            "type": tool_input.get('type', ''),
-            "outputMode": tool_input.get('output_mode', 'files_with_matches'),
-            "caseInsensitive": tool_input.get('-i', False),
-            "multiline": tool_input.get('multiline', False)
+            "pattern": get('pattern', ''),
+            "path": get('path', ''),
+            "glob": get('glob', ''),
+            "type": get('type', ''),
+            "outputMode": get('output_mode', 'files_with_matches'),
+            "caseInsensitive": get('-i', False),
+            "multiline": get('multiline', False)
         }
 
     def parse_glob_tool(self, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """Extract metadata from Glob tool."""
+        get = tool_input.get
         return {
-            "pattern": tool_input.get('pattern', ''),
-            "path": tool_input.get('path', '')
+            "pattern": get('pattern', ''),
+            "path": get('path', '')
         }
 
     def parse_task_tool(self, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """Extract metadata from Task (subagent) tool."""
+        get = tool_input.get
         return {
-            "subagentType": tool_input.get('subagent_type', ''),
-            "description": tool_input.get('description', ''),
-            "model": tool_input.get('model', ''),
-            "resume": tool_input.get('resume', '')
+            "subagentType": get('subagent_type', ''),
+            "description": get('description', ''),
+            "model": get('model', ''),
+            "resume": get('resume', '')
         }
 
     def parse_websearch_tool(self, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """Extract metadata from WebSearch tool."""
+        get = tool_input.get
         return {
-            "query": tool_input.get('query', ''),
-            "allowedDomains": tool_input.get('allowed_domains', []),
-            "blockedDomains": tool_input.get('blocked_domains', [])
+            "query": get('query', ''),
+            "allowedDomains": get('allowed_domains', []),
+            "blockedDomains": get('blocked_domains', [])
         }
 
     def parse_webfetch_tool(self, tool_input: Dict[str, Any]) -> Dict[str, Any]:
         """Extract metadata from WebFetch tool."""
+        get = tool_input.get
         return {
-            "url": tool_input.get('url', ''),
-            "prompt": tool_input.get('prompt', '')
+            "url": get('url', ''),
+            "prompt": get('prompt', '')
         }
 
     def parse_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> Dict[str, Any]:
@@ -186,22 +252,10 @@ class ToolMetadataParser:
         Returns:
             Dict with extracted metadata
         """
-        parsers = {
-            'Read': self.parse_read_tool,
-            'Edit': self.parse_edit_tool,
-            'Write': self.parse_write_tool,
-            'Bash': self.parse_bash_tool,
-            'Grep': self.parse_grep_tool,
-            'Glob': self.parse_glob_tool,
-            'Task': self.parse_task_tool,
-            'WebSearch': self.parse_websearch_tool,
-            'WebFetch': self.parse_webfetch_tool,
-        }
-
-        parser = parsers.get(tool_name)
-        if parser:
+        method_name = self._PARSER_METHODS.get(tool_name)
+        if method_name:
             try:
-                return parser(tool_input)
+                return getattr(self, method_name)(tool_input)
             except Exception as e:
                 return {"error": str(e)}
 
@@ -209,6 +263,12 @@ class ToolMetadataParser:
         return {}
 
 
+@functools.lru_cache(maxsize=8)
+def get_parser(project_dir: str) -> ToolMetadataParser:
+    """Return the process-wide ToolMetadataParser for project_dir."""
+    return ToolMetadataParser(project_dir)
+
+
 # Standalone test
 if __name__ == '__main__':
     import json
@@ -9,19 +9,117 @@ Provides workflow-level insights by analyzing:
 - Workflow patterns (TDD, iterative, etc.)
 """
 
+import os
 import json
 import re
+import time
+import functools
+from collections import Counter
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timezone
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Tools whose use can indicate the planning phase
+_PLANNING_TOOLS = frozenset(('Read', 'Glob', 'Grep', 'Task'))
+
+# Tools that modify files
+_FILE_WRITE_TOOLS = frozenset(('Write', 'Edit'))
+
+# Bash command substrings marking test runs and ad-hoc program runs
+_TEST_KEYWORDS = ('pytest', 'test', 'npm test', 'cargo test')
+_DEBUG_KEYWORDS = ('python', 'node', 'cargo run')
+
+# Short tool input fields searched for planning hints; the rest of the
+# input (file contents, edit strings) can be large and is never scanned
+_HINT_FIELDS = ('description', 'prompt', 'pattern', 'file_path', 'path')
+
+# Largest pyproject.toml read when detecting frameworks
+_PYPROJECT_MAX_BYTES = 64 * 1024
+
+# Leading distribution name of a PEP 508 requirement ("FastAPI[all]>=0.100")
+_REQUIREMENT_NAME_RE = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+
+# Extensions of documentation files
+_DOC_EXTS = ('.md', '.rst', '.txt')
+
+
+def _phase_result(phase: str, confidence: float, indicators: List[str]) -> Dict[str, Any]:
+    """Build the detect_phase result dict."""
+    return {
+        "phase": phase,
+        "confidence": confidence,
+        "indicators": indicators
+    }
+
+
+def _pyproject_dependencies(content: str) -> Optional[set]:
+    """
+    Collect lowercased dependency names declared in a pyproject.toml.
+
+    Reads [project] dependencies and optional-dependencies and
+    [tool.poetry] dependencies, dev-dependencies and groups.
+
+    Returns:
+        Set of names, or None if the content cannot be parsed as TOML
+    """
+    if tomllib is None:
+        return None
+    try:
+        data = tomllib.loads(content)
+    except tomllib.TOMLDecodeError:
+        return None
+
+    requirements = []
+    project = data.get('project', {})
+    requirements.extend(project.get('dependencies', []))
+    for extra in project.get('optional-dependencies', {}).values():
+        requirements.extend(extra)
+
+    names = set()
+    for requirement in requirements:
+        match = _REQUIREMENT_NAME_RE.match(requirement) if isinstance(requirement, str) else None
+        if match:
+            names.add(match.group(0).lower())
+
+    poetry = data.get('tool', {}).get('poetry', {})
+    tables = [poetry.get('dependencies', {}), poetry.get('dev-dependencies', {})]
+    tables.extend(group.get('dependencies', {}) for group in poetry.get('group', {}).values())
+    for table in tables:
+        names.update(name.lower() for name in table)
+
+    return names
 
 
 class WorkflowIntelligence:
     """Collects Tier 2 workflow intelligence metadata."""
 
-    def __init__(self, project_dir: str):
+    def __init__(self, project_dir: str, state: Optional[Dict[str, Any]] = None):
         self.project_dir = Path(project_dir)
-        self.state_file = Path.home() / '.claude-observability-state.json'
+        self._project_dir_str = str(project_dir)
+
+        # Session state already loaded by MetadataCollector (snapshot plus
+        # replayed state log); taken from the process collector when not given
+        self.state = state
+
+        # Last detect_project_type result, reused until the project directory
+        # or one of the manifests it reads changes (see _project_type_mtimes)
+        self._project_type_cache: Optional[Dict[str, Any]] = None
+        self._project_type_key: Optional[tuple] = None
+
+    def _get_state(self) -> Optional[Dict[str, Any]]:
+        """Return the session state, or None if there is none yet."""
+        if self.state is not None:
+            return self.state
+
+        from metadata_collector import get_collector
+        return get_collector(self._project_dir_str)._state or None
 
     def detect_phase(self, tool_name: str, tool_input: Dict, recent_tools: List[str]) -> Dict[str, Any]:
         """
@@ -36,66 +134,45 @@ class WorkflowIntelligence:
         - testing: Running tests, pytest, npm test, etc.
         """
 
-        phase = "unknown"
-        confidence = 0.5
-        indicators = []
-
-        # Planning indicators
-        if tool_name in ['Read', 'Glob', 'Grep', 'Task']:
-            if 'plan' in str(tool_input).lower() or 'explore' in str(tool_input).lower():
-                phase = "planning"
-                confidence = 0.85
-                indicators.append(f"{tool_name} tool suggests exploration")
-
-        # Implementation indicators
-        if tool_name in ['Write', 'Edit']:
-            if not any(ext in str(tool_input) for ext in ['.md', '.txt']):
-                phase = "implementation"
-                confidence = 0.80
-                indicators.append(f"{tool_name} tool on code files")
-
-                # Higher confidence if multiple edits recently
-                if recent_tools.count('Edit') + recent_tools.count('Write') > 2:
-                    confidence = 0.90
-                    indicators.append("Multiple consecutive file modifications")
+        # Each tool is checked by one branch that returns its phase; for
+        # Write/Edit the checks run in priority order (refactoring, then
+        # documentation, then implementation)
+        if tool_name in _PLANNING_TOOLS:
+            hint = ' '.join(
+                value for value in map(tool_input.get, _HINT_FIELDS) if isinstance(value, str)
+            ).lower()
+            if 'plan' in hint or 'explore' in hint:
+                return _phase_result("planning", 0.85, [f"{tool_name} tool suggests exploration"])
+
+        elif tool_name in _FILE_WRITE_TOOLS:
+            # Refactoring indicators
+            if tool_name == 'Edit' and tool_input.get('replace_all'):
+                return _phase_result("refactoring", 0.85, ["Global replace suggests refactoring"])
+
+            # Documentation indicators
+            basename = tool_input.get('file_path', '').rpartition('/')[2]
+            if basename.endswith(_DOC_EXTS) or basename.partition('.')[0] == 'README':
+                return _phase_result("documentation", 0.90, ["Writing documentation files"])
+
+            # Implementation indicators; higher confidence if multiple edits recently
+            indicators = [f"{tool_name} tool on code files"]
+            if recent_tools.count('Edit') + recent_tools.count('Write') > 2:
+                indicators.append("Multiple consecutive file modifications")
+                return _phase_result("implementation", 0.90, indicators)
+            return _phase_result("implementation", 0.80, indicators)
 
         # Debugging indicators
-        if tool_name == 'Bash':
+        elif tool_name == 'Bash':
             command = tool_input.get('command', '')
-            if any(kw in command for kw in ['pytest', 'test', 'npm test', 'cargo test']):
-                phase = "testing"
-                confidence = 0.95
-                indicators.append("Running test suite")
-            elif any(kw in command for kw in ['python', 'node', 'cargo run']):
-                phase = "debugging"
-                confidence = 0.75
-                indicators.append("Executing code for debugging")
-
-        if tool_name == 'BashOutput':
-            phase = "debugging"
-            confidence = 0.70
-            indicators.append("Monitoring command output")
-
-        # Documentation indicators
-        if tool_name in ['Write', 'Edit']:
-            file_path = tool_input.get('file_path', '')
-            if file_path.endswith(('.md', '.rst', '.txt')) or 'README' in file_path:
-                phase = "documentation"
-                confidence = 0.90
-                indicators.append("Writing documentation files")
-
-        # Refactoring indicators
-        if tool_name == 'Edit':
-            if 'replace_all' in tool_input and tool_input.get('replace_all'):
-                phase = "refactoring"
-                confidence = 0.85
-                indicators.append("Global replace suggests refactoring")
+            if any(kw in command for kw in _TEST_KEYWORDS):
+                return _phase_result("testing", 0.95, ["Running test suite"])
+            if any(kw in command for kw in _DEBUG_KEYWORDS):
+                return _phase_result("debugging", 0.75, ["Executing code for debugging"])
 
-        return {
-            "phase": phase,
-            "confidence": confidence,
-            "indicators": indicators
-        }
+        elif tool_name == 'BashOutput':
+            return _phase_result("debugging", 0.70, ["Monitoring command output"])
+
+        return _phase_result("unknown", 0.5, [])
 
     def detect_project_type(self) -> Dict[str, Any]:
         """
@@ -111,24 +188,28 @@ class WorkflowIntelligence:
         - desktop_app: Has Electron/Qt/GTK files
         """
 
+        key = self._project_type_mtimes()
+        if self._project_type_cache is not None and key == self._project_type_key:
+            return self._project_type_cache
+
         project_type = "unknown"
         confidence = 0.5
         frameworks = []
         primary_language = None
 
+        # One directory read answers every top-level marker check below
+        try:
+            with os.scandir(self._project_dir_str) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            names = set()
+
         # Check for common project indicators
         project_files = {
-            'package.json': 0,
-            'pyproject.toml': 0,
-            'Cargo.toml': 0,
-            'go.mod': 0,
-            'pom.xml': 0
+            file: 1 if file in names else 0
+            for file in ('package.json', 'pyproject.toml', 'Cargo.toml', 'go.mod', 'pom.xml')
         }
 
-        for file, _ in project_files.items():
-            if (self.project_dir / file).exists():
-                project_files[file] = 1
-
         # Detect language
         if project_files['package.json']:
             primary_language = 'JavaScript/TypeScript'
@@ -140,20 +221,20 @@ class WorkflowIntelligence:
             primary_language = 'Go'
 
         # Detect project type
-        if (self.project_dir / 'frontend').exists() or (self.project_dir / 'public').exists():
+        if 'frontend' in names or 'public' in names:
             project_type = 'web_application'
             confidence = 0.85
-        elif (self.project_dir / 'backend').exists() or (self.project_dir / 'api').exists():
+        elif 'backend' in names or 'api' in names:
             project_type = 'api_server'
             confidence = 0.80
-        elif (self.project_dir / 'src' / 'main.py').exists() or (self.project_dir / 'cli.py').exists():
+        elif 'cli.py' in names or ('src' in names and os.path.isfile(os.path.join(self._project_dir_str, 'src', 'main.py'))):
             project_type = 'cli_tool'
             confidence = 0.75
 
         # Detect frameworks
         if project_files['package.json']:
             try:
-                with open(self.project_dir / 'package.json') as f:
+                with open(os.path.join(self._project_dir_str, 'package.json')) as f:
                     pkg = json.load(f)
                     deps = {**pkg.get('dependencies', {}), **pkg.get('devDependencies', {})}
 
@@ -170,23 +251,50 @@ class WorkflowIntelligence:
 
         if project_files['pyproject.toml']:
             try:
-                with open(self.project_dir / 'pyproject.toml') as f:
-                    content = f.read()
-                    if 'fastapi' in content.lower():
-                        frameworks.append('FastAPI')
-                    if 'flask' in content.lower():
-                        frameworks.append('Flask')
-                    if 'django' in content.lower():
-                        frameworks.append('Django')
+                with open(os.path.join(self._project_dir_str, 'pyproject.toml'), encoding='utf-8') as f:
+                    content = f.read(_PYPROJECT_MAX_BYTES)
+
+                # Without a TOML parser (or for a file that does not parse),
+                # fall back to searching the raw text
+                deps = _pyproject_dependencies(content)
+                if deps is None:
+                    content_lower = content.lower()
+                    deps = {name for name in ('fastapi', 'flask', 'django') if name in content_lower}
+
+                if 'fastapi' in deps:
+                    frameworks.append('FastAPI')
+                if 'flask' in deps:
+                    frameworks.append('Flask')
+                if 'django' in deps:
+                    frameworks.append('Django')
             except:
                 pass
 
-        return {
+        self._project_type_cache = {
             "projectType": project_type,
             "primaryLanguage": primary_language,
             "frameworks": frameworks,
             "confidence": confidence
         }
+        self._project_type_key = key
+        return self._project_type_cache
+
+    def _project_type_mtimes(self) -> tuple:
+        """
+        mtimes of the project directory (files added or removed) and of the
+        manifests detect_project_type parses, None for missing ones.
+        """
+        mtimes = []
+        for path in (
+            self._project_dir_str,
+            os.path.join(self._project_dir_str, 'package.json'),
+            os.path.join(self._project_dir_str, 'pyproject.toml'),
+        ):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
 
     def get_todo_tracking(self, session_id: str) -> Dict[str, Any]:
         """
@@ -194,7 +302,8 @@ class WorkflowIntelligence:
         """
 
         try:
-            if not self.state_file.exists():
+            state = self._get_state()
+            if state is None:
                 return {
                     "totalTodos": 0,
                     "completedTodos": 0,
@@ -204,9 +313,6 @@ class WorkflowIntelligence:
                     "lastUpdate": None
                 }
 
-            with open(self.state_file, 'r') as f:
-                state = json.load(f)
-
             # State uses "session_<id>" as keys, not nested under "sessions"
             session_key = f"session_{session_id}"
             session_state = state.get(session_key, {})
@@ -222,9 +328,10 @@ class WorkflowIntelligence:
                     "lastUpdate": None
                 }
 
-            completed = sum(1 for t in todos if t.get('status') == 'completed')
-            in_progress = sum(1 for t in todos if t.get('status') == 'in_progress')
-            pending = sum(1 for t in todos if t.get('status') == 'pending')
+            status_counts = Counter(t.get('status') for t in todos)
+            completed = status_counts['completed']
+            in_progress = status_counts['in_progress']
+            pending = status_counts['pending']
             total = len(todos)
 
             completion_rate = completed / total if total > 0 else 0.0
@@ -263,20 +370,18 @@ class WorkflowIntelligence:
             if skill_name:
                 active_skills.append(skill_name)
                 last_skill = skill_name
-                last_skill_time = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+                from metadata_collector import format_skill_timestamp
+                last_skill_time = format_skill_timestamp(time.time())
 
-        # Load skill history from state
+        # Load skill count and latest skill from state (see record_skill)
         try:
-            if self.state_file.exists():
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
+            state = self._get_state()
+            if state is not None:
+                session_state = state.get(f"session_{session_id}", {})
+                skill_count = session_state.get('skillCount', 0)
 
-                session_state = state.get('sessions', {}).get(session_id, {})
-                skill_history = session_state.get('skillHistory', [])
-                skill_count = len(skill_history)
-
-                if skill_history:
-                    last_entry = skill_history[-1]
+                last_entry = session_state.get('lastSkill')
+                if last_entry:
                     last_skill = last_entry.get('skillName')
                     last_skill_time = last_entry.get('timestamp')
         except:
@@ -294,21 +399,22 @@ class WorkflowIntelligence:
         Detect workflow patterns based on tool usage sequences.
         """
 
+        tools = recent_tools
+
         # Iterative development: Many Read-Edit-Read cycles
-        read_edit_cycles = 0
-        for i in range(len(recent_tools) - 2):
-            if recent_tools[i:i+3] == ['Read', 'Edit', 'Read']:
-                read_edit_cycles += 1
+        read_edit_cycles = sum(
+            1 for i in range(len(tools) - 2)
+            if tools[i] == 'Read' and tools[i + 1] == 'Edit' and tools[i + 2] == 'Read'
+        )
 
         is_iterative = read_edit_cycles > 2
 
         # Test-driven development: Test runs before implementations
-        has_tdd_pattern = False
-        for i in range(len(recent_tools) - 1):
-            if recent_tools[i] == 'Bash' and recent_tools[i+1] in ['Write', 'Edit']:
-                # Could be TDD (test first, then implement)
-                has_tdd_pattern = True
-                break
+        # (could be TDD: test first, then implement)
+        has_tdd_pattern = any(
+            tools[i] == 'Bash' and tools[i + 1] in _FILE_WRITE_TOOLS
+            for i in range(len(tools) - 1)
+        )
 
         # Frequent refactoring: Many Edit operations with replace_all
         edit_count = recent_tools.count('Edit')
@@ -342,3 +448,14 @@ class WorkflowIntelligence:
             "skillUsage": self.get_skill_usage(session_id, tool_name, tool_input),
             "workflowPatterns": self.detect_workflow_patterns(session_id, recent_tools)
         }
+
+
+@functools.lru_cache(maxsize=8)
+def get_workflow_intelligence(project_dir: str) -> WorkflowIntelligence:
+    """
+    Return the process-wide WorkflowIntelligence for project_dir.
+
+    Callers set its state before use; the project type cache is kept
+    across calls.
+    """
+    return WorkflowIntelligence(project_dir)
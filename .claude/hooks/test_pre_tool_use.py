@@ -0,0 +1,78 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#     "orjson",
+# ]
+# ///
+
+"""
+Regression tests for the dangerous rm guard in pre_tool_use.py.
+
+Usage:
+    uv run .claude/hooks/test_pre_tool_use.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pre_tool_use import ALLOWED_RM_DIRECTORIES, is_dangerous_rm_command
+
+
+class DangerousRmCommandTest(unittest.TestCase):
+
+    BLOCKED = [
+        'rm -rf /',
+        'rm -r -f ~',
+        'rm --recursive --force .',
+        'rm -r ../*',
+        'ls && rm -rf $HOME',
+        'sudo rm -rf /',
+        "bash -c 'rm -rf /'",
+        'eval rm -rf /',
+        # Bypasses of the tokenizer guard that the old regex blocked
+        '{ rm -rf /; }',
+        'if true; then rm -rf /; fi',
+        'for d in a; do rm -rf /; done',
+        'sudo -u root rm -rf /',
+        'doas -u root rm -rf /',
+        'nice -n 10 rm -rf /',
+        'timeout 5 rm -rf /',
+        'stdbuf -o0 rm -rf /',
+        'watch rm -rf /',
+        r'find . -exec rm -rf {} \;',
+        'bash -lc "rm -rf /"',
+        'sh -ec "rm -rf /"',
+        'RM -RF /',
+    ]
+
+    ALLOWED = [
+        'rm file.txt',
+        'rm -f build.log',
+        'rm -r build',
+        'rm -rf trees/feature',
+        'rm -rf ./trees/feature',
+        'git rm -r --cached dist',
+        'git rm -rf old_module',
+        'echo "rm -rf /"',
+        'grep -r "rm -rf" .',
+        'bash -lc "ls -la"',
+        'bash -o pipefail -c "make test"',
+    ]
+
+    def test_blocked(self):
+        for command in self.BLOCKED:
+            with self.subTest(command=command):
+                self.assertTrue(is_dangerous_rm_command(command, ALLOWED_RM_DIRECTORIES))
+
+    def test_allowed(self):
+        for command in self.ALLOWED:
+            with self.subTest(command=command):
+                self.assertFalse(is_dangerous_rm_command(command, ALLOWED_RM_DIRECTORIES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Append-only JSON Lines logging for per-session hook logs.
+
+Expects the hooks' shared/ directory on sys.path (every hook adds it before
+importing utils) for the JSON codec.
+"""
+
+from pathlib import Path
+
+from json_codec import dumps, loads, JSONDecodeError
+
+
+def migrate_json_log(json_path: Path, out) -> None:
+    """
+    Convert a legacy JSON array log into JSON Lines.
+
+    Older hook versions rewrote `<name>.json` as a full JSON array on every
+    call. Its entries are written to `out` and the old file is removed.
+
+    Args:
+        json_path: Path to the legacy `.json` log file
+        out: Binary file the JSON Lines entries are written to
+    """
+    try:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return
+
+    try:
+        entries = loads(raw)
+    except (JSONDecodeError, ValueError):
+        entries = []
+
+    if isinstance(entries, list) and entries:
+        out.write(b'\n'.join(dumps(e) for e in entries) + b'\n')
+
+    json_path.unlink()
+
+
+def append_log_entry(log_dir: Path, name: str, entry) -> Path:
+    """
+    Append a single entry to the session's `<name>.jsonl` log.
+
+    A legacy `<name>.json` log is migrated when the `.jsonl` log is first
+    created, so later calls never look for it.
+
+    Args:
+        log_dir: Session log directory (see ensure_session_log_dir)
+        name: Log name without extension (e.g. 'pre_tool_use')
+        entry: JSON-serializable entry to append
+
+    Returns:
+        Path of the JSON Lines log file
+    """
+    log_path = log_dir / f'{name}.jsonl'
+
+    with open(log_path, 'ab', buffering=1 << 16) as f:
+        if f.tell() == 0:
+            migrate_json_log(log_dir / f'{name}.json', f)
+        f.write(dumps(entry) + b'\n')
+
+    return log_path
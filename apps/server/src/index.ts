@@ -103,6 +103,42 @@ async function sendResponseToAgent(
   });
 }
 
+// Check the fields every hook event must carry
+function isValidEvent(event: HookEvent): boolean {
+  return !!(event && event.source_app && event.session_id && event.hook_event_type && event.payload);
+}
+
+// Enrich, store and broadcast a validated event
+function ingestEvent(event: HookEvent): HookEvent {
+  // Extract tokens from payload if not already provided
+  if (!event.input_tokens && !event.output_tokens) {
+    const tokens = extractTokensFromPayload(event.payload);
+    event.input_tokens = tokens.input_tokens;
+    event.output_tokens = tokens.output_tokens;
+  }
+
+  // Calculate cost if we have token counts
+  if (event.input_tokens !== undefined && event.output_tokens !== undefined) {
+    event.cost_usd = calculateCost(event.model_name, event.input_tokens, event.output_tokens);
+  }
+
+  // Insert event into database
+  const savedEvent = insertEvent(event);
+
+  // Broadcast to all WebSocket clients
+  const message = JSON.stringify({ type: 'event', data: savedEvent });
+  wsClients.forEach(client => {
+    try {
+      client.send(message);
+    } catch (err) {
+      // Client disconnected, remove from set
+      wsClients.delete(client);
+    }
+  });
+
+  return savedEvent;
+}
+
 // Create Bun server with HTTP and WebSocket support
 const server = Bun.serve({
   port: parseInt(process.env.SERVER_PORT || '4000'),
@@ -128,44 +164,63 @@ const server = Bun.serve({
         const event: HookEvent = await req.json();
         
         // Validate required fields
-        if (!event.source_app || !event.session_id || !event.hook_event_type || !event.payload) {
+        if (!isValidEvent(event)) {
           return new Response(JSON.stringify({ error: 'Missing required fields' }), {
             status: 400,
             headers: { ...headers, 'Content-Type': 'application/json' }
           });
         }
 
-        // Extract tokens from payload if not already provided
-        if (!event.input_tokens && !event.output_tokens) {
-          const tokens = extractTokensFromPayload(event.payload);
-          event.input_tokens = tokens.input_tokens;
-          event.output_tokens = tokens.output_tokens;
-        }
+        const savedEvent = ingestEvent(event);
+        
+        return new Response(JSON.stringify(savedEvent), {
+          headers: { ...headers, 'Content-Type': 'application/json' }
+        });
+      } catch (error) {
+        console.error('Error processing event:', error);
+        return new Response(JSON.stringify({ error: 'Invalid request' }), {
+          status: 400,
+          headers: { ...headers, 'Content-Type': 'application/json' }
+        });
+      }
+    }
+
+    // POST /events/batch - Receive an array of queued events in one request
+    if (url.pathname === '/events/batch' && req.method === 'POST') {
+      try {
+        const events: HookEvent[] = await req.json();
 
-        // Calculate cost if we have token counts
-        if (event.input_tokens !== undefined && event.output_tokens !== undefined) {
-          event.cost_usd = calculateCost(event.model_name, event.input_tokens, event.output_tokens);
+        if (!Array.isArray(events)) {
+          return new Response(JSON.stringify({ error: 'Expected an array of events' }), {
+            status: 400,
+            headers: { ...headers, 'Content-Type': 'application/json' }
+          });
         }
 
-        // Insert event into database
-        const savedEvent = insertEvent(event);
-        
-        // Broadcast to all WebSocket clients
-        const message = JSON.stringify({ type: 'event', data: savedEvent });
-        wsClients.forEach(client => {
+        let accepted = 0;
+        let rejected = 0;
+        for (const event of events) {
+          // Skip invalid entries so one bad event doesn't block the batch
+          if (!isValidEvent(event)) {
+            rejected++;
+            continue;
+          }
+          // Count failed inserts too: the batch always answers 200, since
+          // a 4xx after some events were stored makes the client resend them
           try {
-            client.send(message);
-          } catch (err) {
-            // Client disconnected, remove from set
-            wsClients.delete(client);
+            ingestEvent(event);
+            accepted++;
+          } catch (error) {
+            console.error('Error processing batched event:', error);
+            rejected++;
           }
-        });
-        
-        return new Response(JSON.stringify(savedEvent), {
+        }
+
+        return new Response(JSON.stringify({ accepted, rejected }), {
           headers: { ...headers, 'Content-Type': 'application/json' }
         });
       } catch (error) {
-        console.error('Error processing event:', error);
+        console.error('Error processing event batch:', error);
         return new Response(JSON.stringify({ error: 'Invalid request' }), {
           status: 400,
           headers: { ...headers, 'Content-Type': 'application/json' }